@@ -0,0 +1,130 @@
+import itertools
+import random
+import time
+
+from data_structures.avl_tree import AVLTree
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def in_order(node, out: list):
+    # What percentile queries had to do before: walk the whole tree
+    if node is None:
+        return
+    in_order(node.left, out)
+    out.append(node.value)
+    in_order(node.right, out)
+
+
+def bench_order_statistics(tree: AVLTree, queries: int) -> dict:
+    rng = random.Random(1)
+    n = len(tree)
+    ks = [rng.randrange(n) for _ in range(queries)]
+    ranges = [sorted((rng.random(), rng.random())) for _ in range(queries)]
+
+    def select():
+        for k in ks:
+            tree.select(k)
+
+    def count_range():
+        for lo, hi in ranges:
+            tree.count_range(lo, hi)
+
+    def traverse():
+        # A full walk per query, so only time a few of them
+        for k in ks[: max(1, queries // 1000)]:
+            values = []
+            in_order(tree.root, values)
+            values[k]
+
+    return {
+        "select": timed(select) / queries,
+        "count_range": timed(count_range) / queries,
+        "in-order walk": timed(traverse) / max(1, queries // 1000),
+    }
+
+
+def bench_bulk(n: int) -> dict:
+    values = list(range(0, 2 * n, 2))
+    odd = list(range(1, 2 * n, 2))
+
+    def append_all():
+        tree = AVLTree()
+        for v in values:
+            tree.append(v)
+
+    results = {
+        f"from_sorted({n})": timed(lambda: AVLTree.from_sorted(values)),
+        f"{n} sorted appends": timed(append_all),
+    }
+
+    # Merging sets of equal and of very different size, union_update()
+    # consumes small so both trees are rebuilt outside the timing
+    for m in (n, n // 1000):
+        big, small = AVLTree.from_sorted(values), AVLTree.from_sorted(odd[:m])
+        results[f"union_update({n}, {m})"] = timed(lambda: big.union_update(small))
+
+        big = AVLTree.from_sorted(values)
+
+        def append_small():
+            for v in odd[:m]:
+                big.append(v)
+
+        results[f"{m} appends into {n}"] = timed(append_small)
+
+    return results
+
+
+def bench_range_scans(tree: AVLTree, queries: int, page: int) -> dict:
+    rng = random.Random(2)
+    starts = [rng.random() for _ in range(queries)]
+
+    def irange_page():
+        for lo in starts:
+            list(itertools.islice(tree.irange(lo), page))
+
+    def floor_ceiling():
+        for lo in starts:
+            tree.floor(lo)
+            tree.ceiling(lo)
+
+    def walk_page():
+        # Materialise everything and cut the page out, so only time a few
+        for lo in starts[: max(1, queries // 1000)]:
+            values = []
+            in_order(tree.root, values)
+            [v for v in values if v >= lo][:page]
+
+    return {
+        f"irange page of {page}": timed(irange_page) / queries,
+        "floor + ceiling": timed(floor_ceiling) / queries,
+        f"walk, page of {page}": timed(walk_page) / max(1, queries // 1000),
+    }
+
+
+def main(n: int = 200_000, queries: int = 100_000):
+    rng = random.Random(0)
+    tree = AVLTree()
+    for _ in range(n):
+        tree.append(rng.random())
+
+    print(f"Order statistics on an AVLTree of {n} floats")
+    for name, seconds in bench_order_statistics(tree, queries).items():
+        print(f"{name:<20}{seconds * 1e6:>12.2f}us per query")
+
+    print("Range scans on the same tree")
+    for name, seconds in bench_range_scans(tree, queries // 10, 100).items():
+        print(f"{name:<20}{seconds * 1e6:>12.2f}us per query")
+
+    bulk_n = 1_000_000
+    print(f"Bulk loading and merging sorted sets of up to {bulk_n} values")
+    for name, seconds in bench_bulk(bulk_n).items():
+        print(f"{name:<32}{seconds:>8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
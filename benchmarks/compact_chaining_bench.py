@@ -0,0 +1,55 @@
+import random
+import time
+import tracemalloc
+
+from data_structures.hash_table import HashTable, TableType
+
+TABLE_TYPES = (TableType.SEPARATE_CHAINING, TableType.COMPACT_CHAINING)
+
+
+def bytes_per_key(table_type: TableType, keys: list) -> float:
+    # Keys and values are allocated up front, so only the table's own
+    # structures (buckets, entries, arrays) get counted.
+    tracemalloc.start()
+    table = HashTable(table_type=table_type)
+    for k in keys:
+        table[k] = k
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return used / len(keys)
+
+
+def lookups_per_sec(table_type: TableType, keys: list, rounds: int = 3) -> float:
+    table = HashTable(table_type=table_type)
+    for k in keys:
+        table[k] = k
+
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for k in keys:
+            table[k]
+        best = min(best, time.perf_counter() - start)
+
+    return len(keys) / best
+
+
+def main(n: int = 500_000):
+    rng = random.Random(0)
+    int_keys = [rng.getrandbits(63) for _ in range(n)]
+    str_keys = [f"user:{k:x}" for k in int_keys]
+
+    print(f"{n} keys")
+    print(f"{'backend':<20}{'keys':>6}{'bytes/key':>12}{'lookups/sec':>14}")
+    for name, keys in (("int", int_keys), ("str", str_keys)):
+        for table_type in TABLE_TYPES:
+            print(
+                f"{table_type.name:<20}{name:>6}"
+                f"{bytes_per_key(table_type, keys):>12.1f}"
+                f"{lookups_per_sec(table_type, keys):>14,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
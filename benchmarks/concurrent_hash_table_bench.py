@@ -0,0 +1,78 @@
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from data_structures.hash_table import ConcurrentHashTable, HashTable
+
+THREAD_COUNTS = (1, 2, 4, 8)
+
+
+class GlobalLockTable:
+    # What we had to do before: one lock around a plain HashTable
+    def __init__(self):
+        self.table = HashTable()
+        self.lock = threading.Lock()
+
+    def __getitem__(self, key):
+        with self.lock:
+            return self.table[key]
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            self.table[key] = value
+
+
+def worker(table, keys: list, write_ratio: float, seed: int) -> int:
+    rng = random.Random(seed)
+    writes = set(rng.sample(range(len(keys)), int(len(keys) * write_ratio)))
+    for n, k in enumerate(keys):
+        if n in writes:
+            table[k] = n
+        else:
+            table[k]
+
+    return len(keys)
+
+
+def ops_per_sec(table, keys: list, threads: int, write_ratio: float) -> float:
+    per_thread = len(keys) // threads
+    chunks = [keys[t * per_thread : (t + 1) * per_thread] for t in range(threads)]
+    with ThreadPoolExecutor(threads) as executor:
+        start = time.perf_counter()
+        done = sum(
+            executor.map(
+                worker,
+                [table] * threads,
+                chunks,
+                [write_ratio] * threads,
+                range(threads),
+            )
+        )
+        return done / (time.perf_counter() - start)
+
+
+def main(n: int = 400_000, write_ratio: float = 0.1):
+    rng = random.Random(0)
+    key_space = [rng.getrandbits(63) for _ in range(n // 4)]
+    keys = [rng.choice(key_space) for _ in range(n)]
+
+    gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"{n} ops, {write_ratio:.0%} writes, GIL enabled: {gil_enabled}")
+    print(f"{'table':<22}" + "".join(f"{t:>12}" for t in THREAD_COUNTS))
+    for name, factory in (
+        ("global lock", GlobalLockTable),
+        ("ConcurrentHashTable", ConcurrentHashTable),
+    ):
+        row = []
+        for threads in THREAD_COUNTS:
+            table = factory()
+            for k in key_space:
+                table[k] = 0
+            row.append(ops_per_sec(table, keys, threads, write_ratio))
+        print(f"{name:<22}" + "".join(f"{r:>12,.0f}" for r in row))
+
+
+if __name__ == "__main__":
+    main()
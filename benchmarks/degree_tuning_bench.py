@@ -0,0 +1,42 @@
+import pickle
+import sys
+
+from data_structures.indexed_priority_queue import (
+    benchmark_degrees,
+    synthetic_trace,
+)
+
+MIXES = {
+    "dijkstra-like": {"add": 0.25, "decrease": 0.5, "poll": 0.25},
+    "add/poll churn": {"add": 0.5, "decrease": 0.0, "poll": 0.5},
+    "decrease heavy": {"add": 0.15, "decrease": 0.75, "poll": 0.1},
+}
+
+
+def report(name: str, trace: list):
+    results = benchmark_degrees(trace)
+    best = max(results, key=lambda degree: results[degree]["ops_per_sec"])
+
+    print(f"{name}, {len(trace)} operations, best d={best}")
+    print(f"{'d':>4}{'ops/s':>14}{'comparisons':>14}{'moves':>12}")
+    for degree, r in results.items():
+        print(
+            f"{degree:>4}{r['ops_per_sec']:>14,.0f}"
+            f"{r['comparisons']:>14,}{r['moves']:>12,}"
+        )
+
+
+def main(length: int = 200_000):
+    # A recorded trace can be passed as a pickled list of ("add", ki, value),
+    # ("decrease", ki, value) and ("poll", None, None) tuples
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as file:
+            report(sys.argv[1], pickle.load(file))
+        return
+
+    for name, mix in MIXES.items():
+        report(name, synthetic_trace(length, mix))
+
+
+if __name__ == "__main__":
+    main()
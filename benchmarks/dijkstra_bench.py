@@ -0,0 +1,84 @@
+import random
+import time
+
+from data_structures.indexed_priority_queue import (
+    MinIndexedDHeap,
+    MinIndexedPairingHeap,
+    MinIndexedRadixHeap,
+)
+
+
+def road_network(width: int, height: int, seed: int = 0) -> list:
+    # Grid of intersections with integer travel times: most streets are slow,
+    # every 16th row and column is a fast arterial road and a few streets are
+    # missing, so shortest paths bend around blocks like on a real map.
+    rng = random.Random(seed)
+    n = width * height
+    adj = [[] for _ in range(n)]
+
+    def connect(u, v, arterial):
+        if not arterial and rng.random() < 0.1:
+            return
+        w = rng.randint(2, 6) if arterial else rng.randint(10, 60)
+        adj[u].append((v, w))
+        adj[v].append((u, w))
+
+    for y in range(height):
+        for x in range(width):
+            u = y * width + x
+            if x + 1 < width:
+                connect(u, u + 1, y % 16 == 0)
+            if y + 1 < height:
+                connect(u, u + width, x % 16 == 0)
+
+    return adj
+
+
+def dijkstra(adj: list, source: int, heap) -> list:
+    dist = [None] * len(adj)
+    dist[source] = 0
+    heap.add(source, 0)
+    while heap:
+        u = heap.poll_min_key_index()
+        du = dist[u]
+        for v, w in adj[u]:
+            dv = du + w
+            if dist[v] is None:
+                dist[v] = dv
+                heap.add(v, dv)
+            elif dv < dist[v]:
+                dist[v] = dv
+                heap.decrease(v, dv)
+
+    return dist
+
+
+def main(width: int = 300, height: int = 300, runs: int = 3):
+    adj = road_network(width, height)
+    n = len(adj)
+    engines = {
+        "MinIndexedDHeap(d=2)": lambda: MinIndexedDHeap(2, n),
+        "MinIndexedDHeap(d=4)": lambda: MinIndexedDHeap(4, n),
+        "MinIndexedDHeap(d=4, 'q')": lambda: MinIndexedDHeap(4, n, value_type="q"),
+        "MinIndexedRadixHeap": lambda: MinIndexedRadixHeap(max_size=n),
+        "MinIndexedPairingHeap": lambda: MinIndexedPairingHeap(max_size=n),
+    }
+
+    rng = random.Random(1)
+    sources = [rng.randrange(n) for _ in range(runs)]
+    expected = None
+    print(f"Dijkstra on a {width}x{height} road grid, {runs} sources")
+    for name, make_heap in engines.items():
+        start = time.perf_counter()
+        dists = [dijkstra(adj, s, make_heap()) for s in sources]
+        seconds = (time.perf_counter() - start) / runs
+
+        if expected is None:
+            expected = dists
+        elif dists != expected:
+            raise AssertionError(f"{name} found different distances")
+        print(f"{name:<28}{seconds:>8.3f}s per run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import random
+import time
+
+from data_structures.hash_table import HashTable, TableType
+
+TABLE_TYPES = (
+    TableType.SEPARATE_CHAINING,
+    TableType.OPEN_ADDRESSING,
+    TableType.ROBIN_HOOD,
+    TableType.COMPACT_CHAINING,
+)
+
+
+def make_keys(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [rng.getrandbits(63) for _ in range(n)]
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def bench_backend(table_type: TableType, keys: list, misses: list) -> dict:
+    table = HashTable(table_type=table_type)
+
+    def insert():
+        for k in keys:
+            table[k] = k
+
+    def hit():
+        for k in keys:
+            table[k]
+
+    def miss():
+        for k in misses:
+            k in table
+
+    def churn():
+        for k in keys[::2]:
+            del table[k]
+        for k in keys[::2]:
+            table[k] = k
+
+    n = len(keys)
+    return {
+        "insert": n / timed(insert),
+        "hit": n / timed(hit),
+        "miss": len(misses) / timed(miss),
+        "churn": n / timed(churn),
+        "capacity": table.table.capacity,
+        "load": len(table) / table.table.capacity,
+    }
+
+
+def main(n: int = 200_000):
+    keys = make_keys(n)
+    misses = make_keys(n, seed=1)
+
+    print(f"{n} random 63-bit int keys, ops/sec")
+    print(
+        f"{'backend':<20}{'insert':>12}{'hit':>12}{'miss':>12}"
+        f"{'churn':>12}{'capacity':>12}{'load':>8}"
+    )
+    for table_type in TABLE_TYPES:
+        r = bench_backend(table_type, keys, misses)
+        print(
+            f"{table_type.name:<20}{r['insert']:>12,.0f}{r['hit']:>12,.0f}"
+            f"{r['miss']:>12,.0f}{r['churn']:>12,.0f}{r['capacity']:>12}"
+            f"{r['load']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import gc
+import random
+import time
+
+from data_structures.hash_table import HashTable, TableType
+
+BUDGETS = (None, 4, 16, 64)
+
+
+def insert_latencies(table: HashTable, keys: list) -> list:
+    clock = time.perf_counter
+    latencies = []
+    # Keep cyclic GC pauses out of the numbers, we only want resize stalls
+    gc.disable()
+    try:
+        for k in keys:
+            start = clock()
+            table[k] = k
+            latencies.append(clock() - start)
+    finally:
+        gc.enable()
+
+    return latencies
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def main(n: int = 1_000_000):
+    rng = random.Random(0)
+    keys = [rng.getrandbits(63) for _ in range(n)]
+
+    print(f"Insert latency while growing an empty table to {n} keys (microseconds)")
+    print(
+        f"{'backend':<20}{'budget':>8}{'p50':>10}{'p99':>10}{'max':>12}{'total s':>10}"
+    )
+    for table_type in (TableType.SEPARATE_CHAINING, TableType.OPEN_ADDRESSING):
+        for budget in BUDGETS:
+            table = HashTable(table_type=table_type, rehash_budget=budget)
+            latencies = sorted(insert_latencies(table, keys))
+            print(
+                f"{table_type.name:<20}{str(budget):>8}"
+                f"{percentile(latencies, 0.5) * 1e6:>10.2f}"
+                f"{percentile(latencies, 0.99) * 1e6:>10.2f}"
+                f"{latencies[-1] * 1e6:>12.0f}"
+                f"{sum(latencies):>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import random
+import time
+import tracemalloc
+from array import array
+
+from data_structures.hash_table import HashTable, Int64HashMap, TableType
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def build_measured(factory, keys: array, values: array):
+    # Reading from unboxed arrays creates fresh int/float objects, so the boxed
+    # tables pay for their keys and values just like when loading real data.
+    tracemalloc.start()
+    table = factory(keys, values)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return table, used / len(keys)
+
+
+def fill_hash_table(table_type: TableType):
+    def factory(keys, values):
+        table = HashTable(table_type=table_type)
+        for k, v in zip(keys, values):
+            table[k] = v
+        return table
+
+    return factory
+
+
+def fill_int64(keys, values):
+    table = Int64HashMap()
+    for k, v in zip(keys, values):
+        table[k] = v
+    return table
+
+
+def put_many_int64(keys, values):
+    table = Int64HashMap()
+    table.put_many(keys, values)
+    return table
+
+
+def main(n: int = 500_000):
+    rng = random.Random(0)
+    keys = [rng.getrandbits(63) for _ in range(n)]
+    values = [rng.random() for _ in range(n)]
+    key_array = array("q", keys)
+    value_array = array("d", values)
+
+    print(f"{n} random int64 keys with float values")
+    print(f"{'map':<28}{'bytes/key':>12}{'lookups/sec':>14}")
+    rows = (
+        ("HashTable OPEN_ADDRESSING", fill_hash_table(TableType.OPEN_ADDRESSING)),
+        ("HashTable ROBIN_HOOD", fill_hash_table(TableType.ROBIN_HOOD)),
+        ("Int64HashMap", fill_int64),
+    )
+    for name, factory in rows:
+        table, per_key = build_measured(factory, key_array, value_array)
+
+        def lookup():
+            for k in keys:
+                table[k]
+
+        print(f"{name:<28}{per_key:>12.1f}{n / timed(lookup):>14,.0f}")
+
+    table, per_key = build_measured(put_many_int64, key_array, value_array)
+    print(
+        f"{'Int64HashMap get_many':<28}{per_key:>12.1f}"
+        f"{n / timed(lambda: table.get_many(key_array)):>14,.0f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import os
+import tempfile
+import time
+
+from data_structures.hash_table import HashTable, TableType
+from data_structures.persistent_hash_table import PersistentOpenAddressing
+
+
+def main(n: int = 500_000):
+    items = [(f"user:{i}", i) for i in range(n)]
+
+    start = time.perf_counter()
+    table = HashTable(table_type=TableType.OPEN_ADDRESSING)
+    for k, v in items:
+        table[k] = v
+    rebuild = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "table.bin")
+
+        start = time.perf_counter()
+        PersistentOpenAddressing.build(path, iter(items)).close()
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        persistent = PersistentOpenAddressing(path)
+        open_time = time.perf_counter() - start
+
+        keys = [k for k, _ in items[:: max(1, n // 100_000)]]
+        start = time.perf_counter()
+        for k in keys:
+            persistent[k]
+        lookups = len(keys) / (time.perf_counter() - start)
+        persistent.close()
+
+    print(f"{n} string keys")
+    print(f"rebuild OpenAddressing HashTable: {rebuild * 1e3:10.1f} ms")
+    print(f"build persistent file (once):     {build * 1e3:10.1f} ms")
+    print(f"open persistent file:             {open_time * 1e3:10.3f} ms")
+    print(f"persistent lookups/sec:           {lookups:10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import heapq
+from itertools import count
+from operator import attrgetter
+import random
+import time
+
+from data_structures.pqueue import PQueue
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def bench_ingest(values: list) -> dict:
+    def pqueue_append():
+        q = PQueue()
+        for v in values:
+            q.append(v)
+
+    def pqueue_push_many():
+        PQueue().push_many(values)
+
+    def heapq_heappush():
+        heap = []
+        for v in values:
+            heapq.heappush(heap, v)
+
+    def heapq_heapify():
+        heapq.heapify(list(values))
+
+    return {
+        "PQueue.append loop": timed(pqueue_append),
+        "PQueue.push_many": timed(pqueue_push_many),
+        "heapq.heappush loop": timed(heapq_heappush),
+        "heapq.heapify": timed(heapq_heapify),
+    }
+
+
+def bench_drain(values: list, k: int) -> dict:
+    q = PQueue()
+    q.push_many(values)
+    heap = list(values)
+    heapq.heapify(heap)
+
+    return {
+        f"PQueue.poll_many({k})": timed(lambda: q.poll_many(k)),
+        f"heapq.heappop x{k}": timed(lambda: [heapq.heappop(heap) for _ in range(k)]),
+    }
+
+
+def bench_modes(values: list) -> dict:
+    # Steady state: push everything, then alternate removes of random
+    # elements with polls until empty
+    results = {}
+    rng = random.Random(1)
+    victims = rng.sample(values, len(values) // 10)
+    for track_positions in (True, False):
+        q = PQueue(track_positions=track_positions)
+
+        def push():
+            for v in values:
+                q.append(v)
+
+        def remove_and_drain():
+            for v in victims:
+                q.remove(v)
+            while q:
+                q.poll()
+
+        name = "positions tracked" if track_positions else "map-free, lazy"
+        results[name] = (timed(push), timed(remove_and_drain))
+
+    return results
+
+
+def bench_update(values: list, k: int) -> dict:
+    # Reprioritise k random elements, by handle vs by value
+    rng = random.Random(2)
+    picks = rng.sample(range(len(values)), k)
+    new_values = [rng.random() for _ in range(k)]
+
+    by_handle = PQueue()
+    handles = [by_handle.append(v) for v in values]
+    by_value = PQueue()
+    by_value.push_many(values)
+
+    def update():
+        for i, v in zip(picks, new_values):
+            by_handle.update(handles[i], v)
+
+    def remove_append():
+        for i, v in zip(picks, new_values):
+            by_value.remove(values[i])
+            by_value.append(v)
+
+    return {
+        "PQueue.update(handle)": timed(update),
+        "remove + append": timed(remove_append),
+    }
+
+
+class Job:
+    __slots__ = ("priority", "name")
+
+    def __init__(self, priority: float, name: str):
+        self.priority = priority
+        self.name = name
+
+
+def bench_key(values: list) -> dict:
+    # Max heap of objects by attribute: key=/reverse= against wrapping every
+    # job in a (-priority, tie breaker, job) tuple
+    jobs = [Job(v, "job") for v in values]
+
+    def pqueue_key(track_positions):
+        q = PQueue(
+            key=attrgetter("priority"), reverse=True, track_positions=track_positions
+        )
+        for job in jobs:
+            q.append(job)
+        while q:
+            q.poll()
+
+    def pqueue_tuples():
+        q, seq = PQueue(), count()
+        for job in jobs:
+            q.append((-job.priority, next(seq), job))
+        while q:
+            q.poll()
+
+    def heapq_tuples():
+        heap, seq = [], count()
+        for job in jobs:
+            heapq.heappush(heap, (-job.priority, next(seq), job))
+        while heap:
+            heapq.heappop(heap)
+
+    return {
+        "PQueue(key, reverse)": timed(lambda: pqueue_key(True)),
+        "PQueue(key, map-free)": timed(lambda: pqueue_key(False)),
+        "PQueue of tuples": timed(pqueue_tuples),
+        "heapq of tuples": timed(heapq_tuples),
+    }
+
+
+def main(n: int = 1_000_000):
+    rng = random.Random(0)
+    values = [rng.random() for _ in range(n)]
+
+    print(f"Batch ingestion of {n} floats")
+    for name, seconds in bench_ingest(values).items():
+        print(f"{name:<26}{seconds:>8.3f}s{n / seconds:>14,.0f}/s")
+
+    k = n // 10
+    print(f"Draining {k} of them")
+    for name, seconds in bench_drain(values, k).items():
+        print(f"{name:<26}{seconds:>8.3f}s{k / seconds:>14,.0f}/s")
+
+    print(f"PQueue modes, {n} appends, then {n // 10} removes and a full drain")
+    for name, (push, drain) in bench_modes(values).items():
+        print(f"{name:<26}{n / push:>14,.0f} appends/s{n / drain:>14,.0f} polls/s")
+
+    print(f"Changing the priority of {k} elements")
+    for name, seconds in bench_update(values, k).items():
+        print(f"{name:<26}{seconds:>8.3f}s{k / seconds:>14,.0f}/s")
+
+    print(f"Max heap of {k} jobs by attribute, push all then drain")
+    for name, seconds in bench_key(values[:k]).items():
+        print(f"{name:<26}{seconds:>8.3f}s{k / seconds:>14,.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import asyncio
+import queue
+import random
+import threading
+import time
+
+from data_structures.pqueue import AsyncPQueue, ConcurrentPQueue
+
+# Largest possible priority, so consumers only see it once the work is done
+STOP = float("inf")
+
+
+def run_async(make_queue, values: list, producers: int, consumers: int) -> float:
+    async def produce(q, chunk):
+        for v in chunk:
+            await q.put(v)
+
+    async def consume(q):
+        while await q.get() != STOP:
+            pass
+
+    async def run():
+        q = make_queue()
+        chunks = [values[i::producers] for i in range(producers)]
+        tasks = [asyncio.create_task(consume(q)) for _ in range(consumers)]
+        await asyncio.gather(*(produce(q, chunk) for chunk in chunks))
+        for _ in range(consumers):
+            await q.put(STOP)
+        await asyncio.gather(*tasks)
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    return time.perf_counter() - start
+
+
+def run_threads(q, values: list, producers: int, consumers: int, batch: int) -> float:
+    def produce(chunk):
+        if batch == 1:
+            for v in chunk:
+                q.put(v)
+            return
+        for i in range(0, len(chunk), batch):
+            q.put_many(chunk[i : i + batch])
+
+    def consume():
+        if batch == 1:
+            while q.get() != STOP:
+                pass
+            return
+        while True:
+            elems = q.drain(batch)
+            if elems[-1] == STOP:
+                # Every STOP left belongs to another consumer
+                stops = elems.count(STOP) - 1
+                if stops:
+                    q.put_many([STOP] * stops)
+                return
+
+    chunks = [values[i::producers] for i in range(producers)]
+    threads = [threading.Thread(target=consume) for _ in range(consumers)]
+    threads += [threading.Thread(target=produce, args=(c,)) for c in chunks]
+
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads[consumers:]:
+        t.join()
+    for _ in range(consumers):
+        q.put(STOP)
+    for t in threads[:consumers]:
+        t.join()
+    return time.perf_counter() - start
+
+
+def main(n: int = 200_000, producers: int = 4, consumers: int = 4):
+    rng = random.Random(0)
+    values = [rng.random() for _ in range(n)]
+
+    print(f"asyncio, {n} items, {producers} producers, {consumers} consumers")
+    for maxsize in (0, 1000):
+        runs = {
+            f"AsyncPQueue({maxsize})": lambda: AsyncPQueue(maxsize),
+            f"asyncio.PriorityQueue({maxsize})": lambda: asyncio.PriorityQueue(maxsize),
+        }
+        for name, make_queue in runs.items():
+            seconds = run_async(make_queue, values, producers, consumers)
+            print(f"{name:<36}{n / seconds:>14,.0f} items/s")
+
+    print(f"threads, {n} items, {producers} producers, {consumers} consumers")
+    runs = {
+        "ConcurrentPQueue put/get": (ConcurrentPQueue(1000), 1),
+        "ConcurrentPQueue batches of 64": (ConcurrentPQueue(1000), 64),
+        "queue.PriorityQueue put/get": (queue.PriorityQueue(1000), 1),
+    }
+    for name, (q, batch) in runs.items():
+        seconds = run_threads(q, values, producers, consumers, batch)
+        print(f"{name:<36}{n / seconds:>14,.0f} items/s")
+
+
+if __name__ == "__main__":
+    main()
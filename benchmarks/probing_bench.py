@@ -0,0 +1,64 @@
+import random
+import time
+
+from data_structures.hash_table import (
+    DoubleHashing,
+    HashTable,
+    LinearProbing,
+    QuadraticProbing,
+    TableType,
+)
+
+STRATEGIES = (LinearProbing, QuadraticProbing, DoubleHashing)
+
+
+def key_sets(n: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    return {
+        "random ints": [rng.getrandbits(63) for _ in range(n)],
+        "sequential ints": list(range(n)),
+        "ints * 4096": [i * 4096 for i in range(n)],
+        "strings": [f"session:{rng.getrandbits(48):012x}" for _ in range(n)],
+        "int tuples": [(i // 100, i % 100) for i in range(n)],
+    }
+
+
+def run(strategy_type, keys: list) -> dict:
+    table = HashTable(table_type=TableType.OPEN_ADDRESSING, probing=strategy_type())
+
+    start = time.perf_counter()
+    for k in keys:
+        table[k] = k
+    for k in keys:
+        table[k]
+    elapsed = time.perf_counter() - start
+
+    stats = table.stats()
+    return {
+        "mean": stats["mean_probes"],
+        "max": stats["max_probes"],
+        "ops": 2 * len(keys) / elapsed,
+    }
+
+
+def best_strategy(keys: list):
+    """Return the strategy type with the highest throughput on keys."""
+    return max(STRATEGIES, key=lambda strategy: run(strategy, keys)["ops"])
+
+
+def main(n: int = 100_000):
+    print(f"{n} keys per set, insert + lookup")
+    print(f"{'keys':<18}{'strategy':<18}{'mean':>8}{'max':>8}{'ops/sec':>12}")
+    for name, keys in key_sets(n).items():
+        results = {strategy: run(strategy, keys) for strategy in STRATEGIES}
+        best = max(results, key=lambda strategy: results[strategy]["ops"])
+        for strategy, r in results.items():
+            marker = " *" if strategy is best else ""
+            print(
+                f"{name:<18}{strategy.__name__:<18}{r['mean']:>8.2f}"
+                f"{r['max']:>8}{r['ops']:>12,.0f}{marker}"
+            )
+
+
+if __name__ == "__main__":
+    main()
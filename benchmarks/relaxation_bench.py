@@ -0,0 +1,72 @@
+import random
+import time
+from array import array
+
+from data_structures.indexed_priority_queue import MinIndexedDHeap
+
+
+def complete_graph(n: int, seed: int = 0) -> list:
+    # Symmetric weight matrix of a complete graph, one row per vertex
+    rng = random.Random(seed)
+    rows = [array("d", [0.0]) * n for _ in range(n)]
+    for u in range(n):
+        for v in range(u + 1, n):
+            rows[u][v] = rows[v][u] = rng.random()
+    return rows
+
+
+def prim_decrease(rows: list, heap) -> float:
+    # Dense Prim: every settled vertex relaxes the edge to every other one
+    n = len(rows)
+    heap.add_many(range(n), [float("inf")] * n)
+    total = 0.0
+    while heap:
+        total += heap.peek_min_value()
+        u = heap.poll_min_key_index()
+        row = rows[u]
+        for v in heap.keys():
+            heap.decrease(v, row[v])
+    return total
+
+
+def prim_decrease_many(rows: list, heap) -> float:
+    n = len(rows)
+    heap.add_many(range(n), [float("inf")] * n)
+    total = 0.0
+    while heap:
+        total += heap.peek_min_value()
+        u = heap.poll_min_key_index()
+        row = rows[u]
+        kis = list(heap.keys())
+        heap.decrease_many(kis, [row[v] for v in kis])
+    return total
+
+
+def main(n: int = 1500, degree: int = 4):
+    rows = complete_graph(n)
+    runs = {
+        "decrease loop, list": (prim_decrease, None),
+        "decrease loop, array('d')": (prim_decrease, "d"),
+        "decrease_many, list": (prim_decrease_many, None),
+        "decrease_many, array('d')": (prim_decrease_many, "d"),
+    }
+
+    expected = None
+    relaxations = n * (n - 1) // 2
+    print(f"Prim on a complete graph of {n} vertices, d={degree}")
+    for name, (prim, value_type) in runs.items():
+        heap = MinIndexedDHeap(degree, n, value_type=value_type)
+        start = time.perf_counter()
+        total = prim(rows, heap)
+        seconds = time.perf_counter() - start
+
+        if expected is None:
+            expected = total
+        elif abs(total - expected) > 1e-9:
+            raise AssertionError(f"{name} built a different tree")
+        rate = relaxations / seconds
+        print(f"{name:<28}{seconds:>8.3f}s{rate:>14,.0f} relaxations/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import random
+import time
+from collections import deque
+
+from data_structures.hash_table import HashTable, TableType
+
+
+def report(label: str, table: HashTable, seconds: float, ops: int):
+    stats = table.stats()
+    print(
+        f"{label:<14}{len(table):>9}{stats['capacity']:>10}"
+        f"{stats['tombstone_ratio']:>12.3f}{stats['mean_probes']:>8.2f}"
+        f"{stats['max_probes']:>6}{ops / seconds if seconds else 0:>12,.0f}"
+    )
+
+
+def main(live_keys: int = 50_000, rounds: int = 10):
+    # Steady state churn: every round inserts live_keys fresh keys and deletes
+    # the oldest live_keys, so the key count stays put. Capacity, tombstone
+    # ratio and probe lengths should stay flat across rounds.
+    rng = random.Random(0)
+    table = HashTable(table_type=TableType.OPEN_ADDRESSING, track_stats=True)
+    live = deque()
+
+    print(
+        f"{'phase':<14}{'keys':>9}{'capacity':>10}{'tombstones':>12}"
+        f"{'mean':>8}{'max':>6}{'ops/sec':>12}"
+    )
+    start = time.perf_counter()
+    for _ in range(live_keys):
+        k = rng.getrandbits(63)
+        table[k] = k
+        live.append(k)
+    report("fill", table, time.perf_counter() - start, live_keys)
+
+    for r in range(rounds):
+        start = time.perf_counter()
+        for _ in range(live_keys):
+            k = rng.getrandbits(63)
+            table[k] = k
+            live.append(k)
+            del table[live.popleft()]
+        report(f"churn {r + 1}", table, time.perf_counter() - start, 2 * live_keys)
+
+    start = time.perf_counter()
+    while len(live) > live_keys // 100:
+        del table[live.popleft()]
+    report("mass delete", table, time.perf_counter() - start, live_keys)
+
+    resizes = table.stats()["resizes"]
+    print(f"{len(resizes)} resizes/compactions, {sum(r[2] for r in resizes):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import heapq
+from multiprocessing import Pool
+import random
+import time
+
+from data_structures.top_k import TopK
+
+
+def stream(n: int, seed: int):
+    rng = random.Random(seed)
+    return (rng.random() for _ in range(n))
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def select_chunk(args) -> TopK:
+    n, seed, k = args
+    top = TopK(k)
+    top.push_many(stream(n, seed))
+    return top
+
+
+def select_parallel(n: int, k: int, workers: int) -> TopK:
+    # Every worker selects from its own part of the stream, the partial
+    # results are pickled back and merged
+    chunks = [(n // workers, seed, k) for seed in range(workers)]
+    with Pool(workers) as pool:
+        parts = pool.map(select_chunk, chunks)
+
+    top = parts[0]
+    for part in parts[1:]:
+        top.merge(part)
+    return top
+
+
+def main(n: int = 10_000_000, k: int = 100, workers: int = 4):
+    print(f"{k} smallest of a stream of {n} floats")
+
+    def top_k():
+        top = TopK(k)
+        top.push_many(stream(n, 0))
+        return top.items()
+
+    runs = {
+        "heapq.nsmallest": lambda: heapq.nsmallest(k, stream(n, 0)),
+        "TopK.push_many": top_k,
+    }
+    results = {}
+    for name, fn in runs.items():
+        results[name], seconds = timed(fn)
+        print(f"{name:<28}{seconds:>8.3f}s{n / seconds:>14,.0f} items/s")
+    if results["TopK.push_many"] != results["heapq.nsmallest"]:
+        raise AssertionError("TopK selected different items")
+
+    top, seconds = timed(lambda: select_parallel(n, k, workers))
+    name = f"TopK x{workers} processes"
+    print(f"{name:<28}{seconds:>8.3f}s{n / seconds:>14,.0f} items/s")
+
+    # The nearest-rank p99.99 is the (n / 10000 + 1)th largest item
+    top = TopK(n // 10_000 + 1, largest=True)
+    top.push_many(stream(n, 0))
+    print(f"p99.99 of the stream: {top.percentile(99.99):.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import random
+import time
+import tracemalloc
+
+from data_structures.avl_tree import AVLTree, PooledAVLTree
+from data_structures.binary_search_tree import BinarySearchTree
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def bench_engine(make_tree, add, contains, values: list) -> dict:
+    tree = make_tree()
+    lookups = values[::-1]
+
+    def insert():
+        for v in values:
+            add(tree, v)
+
+    def search():
+        for v in lookups:
+            contains(tree, v)
+
+    def remove():
+        for v in values:
+            tree.remove(v)
+
+    return {"insert": timed(insert), "search": timed(search), "remove": timed(remove)}
+
+
+def bench_sorted(make_tree, n: int) -> str:
+    tree = make_tree()
+    try:
+        seconds = timed(lambda: [tree.add(v) for v in range(n)])
+    except RecursionError:
+        return "RecursionError"
+    return f"{seconds:.3f}s"
+
+
+def bytes_per_element(make_tree, add, values: list) -> float:
+    # The values exist beforehand, so only the tree's own memory is counted
+    tracemalloc.start()
+    tree = make_tree()
+    for v in values:
+        add(tree, v)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / len(values)
+
+
+def main(n: int = 200_000, sorted_n: int = 5_000):
+    rng = random.Random(0)
+    values = [rng.random() for _ in range(n)]
+
+    def avl_add(tree, v):
+        tree.append(v)
+
+    def avl_contains(tree, v):
+        return v in tree
+
+    def bst_add(tree, v):
+        tree.add(v)
+
+    def bst_contains(tree, v):
+        return tree.contains(v)
+
+    engines = {
+        "AVLTree iterative": (AVLTree, avl_add, avl_contains),
+        "AVLTree recursive": (lambda: AVLTree(True), avl_add, avl_contains),
+        "PooledAVLTree": (PooledAVLTree, avl_add, avl_contains),
+        "BST iterative": (BinarySearchTree, bst_add, bst_contains),
+        "BST recursive": (lambda: BinarySearchTree(True), bst_add, bst_contains),
+    }
+
+    print(f"{n} random floats, ops/s")
+    print(f"{'':<20}{'insert':>12}{'search':>12}{'remove':>12}")
+    for name, (make_tree, add, contains) in engines.items():
+        results = bench_engine(make_tree, add, contains, values)
+        rates = "".join(f"{n / seconds:>12,.0f}" for seconds in results.values())
+        print(f"{name:<20}{rates}")
+
+    print(f"Memory per element, {n} random floats")
+    for name in ("AVLTree iterative", "PooledAVLTree"):
+        make_tree, add, _ = engines[name]
+        print(f"{name:<20}{bytes_per_element(make_tree, add, values):>12.1f} bytes")
+
+    print(f"BinarySearchTree fed {sorted_n} sorted values")
+    for name, recursive in (("iterative", False), ("recursive", True)):
+        result = bench_sorted(lambda: BinarySearchTree(recursive), sorted_n)
+        print(f"{name:<20}{result:>12}")
+
+
+if __name__ == "__main__":
+    main()
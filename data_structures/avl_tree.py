@@ -1,10 +1,14 @@
 from __future__ import annotations
-from typing import Optional
+from array import array
+from typing import Iterable, Iterator, Optional
+
+from data_structures.tree_queries import TreeQueries
 
 
 class Node:
     bf = 0
     height = 0
+    size = 1  # nodes in the subtree rooted here
     left: Optional[Node] = None
     right: Optional[Node] = None
 
@@ -12,9 +16,15 @@ class Node:
         self.value = value
 
 
-class AVLTree:
-    root: Optional[Node] = None
-    node_count = 0
+class AVLTree(TreeQueries):
+    # recursive=True selects the original recursive engine, which checks
+    # membership before every write and so descends twice. The default
+    # engine descends once, remembers the path and rebalances on the way
+    # back up without recursion.
+    def __init__(self, recursive: bool = False):
+        self.root: Optional[Node] = None
+        self.node_count = 0
+        self.recursive = recursive
 
     def height(self) -> int:
         if self.root is not None:
@@ -26,24 +36,198 @@ class AVLTree:
         return self.node_count
 
     def __contains__(self, value) -> bool:
-        return self.__contains(self.root, value)
+        if self.recursive:
+            return self.__contains(self.root, value)
+
+        node = self.root
+        while node is not None:
+            if value > node.value:
+                node = node.right
+            elif value < node.value:
+                node = node.left
+            else:
+                return True
+
+        return False
 
     def append(self, value) -> bool:
-        if value is None or value in self:
+        if value is None:
+            return False
+
+        if self.recursive:
+            if value in self:
+                return False
+            self.root = self.__append(self.root, value)
+        elif not self.__append_iterative(value):
             return False
 
-        self.root = self.__append(self.root, value)
         self.node_count += 1
         return True
 
     def remove(self, value) -> bool:
-        if value is None or value not in self:
+        if value is None:
+            return False
+
+        if self.recursive:
+            if value not in self:
+                return False
+            self.root = self.__remove(self.root, value)
+        elif not self.__remove_iterative(value):
             return False
 
-        self.root = self.__remove(self.root, value)
         self.node_count -= 1
         return True
 
+    def select(self, k: int):
+        """
+        The k-th smallest value, counting from 0, in O(log n).
+        """
+        if k < 0 or k >= self.node_count:
+            raise IndexError("k out of range")
+
+        node = self.root
+        while True:
+            left_size = 0 if node.left is None else node.left.size
+            if k < left_size:
+                node = node.left
+            elif k > left_size:
+                k -= left_size + 1
+                node = node.right
+            else:
+                return node.value
+
+    def rank(self, value) -> int:
+        """
+        The number of values smaller than value, in O(log n).
+        """
+        return self.__count_below(value, False)
+
+    def count_range(self, lo, hi) -> int:
+        """
+        The number of values in [lo, hi], in O(log n).
+        """
+        if hi < lo:
+            return 0
+
+        return self.__count_below(hi, True) - self.__count_below(lo, False)
+
+    def median(self):
+        # The lower one of the two middle values for an even count
+        if not self.node_count:
+            raise IndexError("Tree is empty")
+
+        return self.select((self.node_count - 1) // 2)
+
+    @classmethod
+    def from_sorted(cls, values: Iterable, recursive: bool = False) -> AVLTree:
+        """
+        Build a perfectly balanced tree from strictly increasing values in
+        O(n), without any rotations.
+        """
+        values = list(values)
+        for i in range(1, len(values)):
+            if not values[i - 1] < values[i]:
+                raise ValueError("Values need to be strictly increasing")
+
+        tree = cls(recursive)
+        tree.root = tree.__build(values, 0, len(values))
+        tree.node_count = len(values)
+        return tree
+
+    # split, join and the *_update set operations below reuse the nodes of
+    # the trees they are given, which are left empty, and run in O(log n) for
+    # split and join and O(m log(n / m + 1)) for the set operations (m <= n).
+    # union, intersection and difference work on copies instead, O(n + m).
+
+    def split(self, value) -> tuple:
+        """
+        Split into a tree of the values smaller than value and one of the
+        values greater than or equal to it.
+        """
+        left, mid, right = self.__split(self.root, value)
+        if mid is not None:
+            right = self.__join(None, mid, right)
+        self.root, self.node_count = None, 0
+        return self.__wrap(left), self.__wrap(right)
+
+    @classmethod
+    def join(cls, left: AVLTree, right: AVLTree) -> AVLTree:
+        """
+        Concatenate two trees, every value of left needs to be smaller than
+        every value of right.
+        """
+        if left.root is not None and right.root is not None:
+            if not left.__find_max(left.root) < right.__find_min(right.root):
+                raise ValueError("left needs to hold only smaller values than right")
+
+        tree = cls(left.recursive)
+        tree.root = tree.__join2(left.root, right.root)
+        tree.node_count = left.node_count + right.node_count
+        left.root, left.node_count = None, 0
+        right.root, right.node_count = None, 0
+        return tree
+
+    def copy(self) -> AVLTree:
+        tree = AVLTree(self.recursive)
+        tree.root = self.__copy(self.root)
+        tree.node_count = self.node_count
+        return tree
+
+    def union(self, other: AVLTree) -> AVLTree:
+        """
+        A new tree of the values in either tree, both stay unchanged.
+        """
+        tree = self.copy()
+        tree.union_update(other.copy())
+        return tree
+
+    def intersection(self, other: AVLTree) -> AVLTree:
+        """
+        A new tree of the values in both trees, both stay unchanged.
+        """
+        tree = self.copy()
+        tree.intersection_update(other.copy())
+        return tree
+
+    def difference(self, other: AVLTree) -> AVLTree:
+        """
+        A new tree of the values not in other, both trees stay unchanged.
+        """
+        tree = self.copy()
+        tree.difference_update(other.copy())
+        return tree
+
+    def union_update(self, other: AVLTree):
+        """
+        Add the values of other. Consumes other: its nodes move into this
+        tree and other is left empty.
+        """
+        self.__set_operation(self.__union, other)
+
+    def intersection_update(self, other: AVLTree):
+        """
+        Keep only the values also in other. Consumes other: it is left empty.
+        """
+        self.__set_operation(self.__intersection, other)
+
+    def difference_update(self, other: AVLTree):
+        """
+        Remove the values in other. Consumes other: it is left empty.
+        """
+        self.__set_operation(self.__difference, other)
+
+    def __count_below(self, value, inclusive: bool) -> int:
+        count = 0
+        node = self.root
+        while node is not None:
+            if value < node.value or (value == node.value and not inclusive):
+                node = node.left
+            else:
+                count += 1 if node.left is None else node.left.size + 1
+                node = node.right
+
+        return count
+
     def __contains(self, node: Optional[Node], value) -> bool:
         if node is None:
             return False
@@ -94,11 +278,206 @@ class AVLTree:
         self.__update(node)
         return self.__balance(node)
 
+    def __append_iterative(self, value) -> bool:
+        # path holds (node, went right) pairs from the root down
+        path = []
+        node = self.root
+        while node is not None:
+            if value > node.value:
+                path.append((node, True))
+                node = node.right
+            elif value < node.value:
+                path.append((node, False))
+                node = node.left
+            else:
+                return False
+
+        self.__rebalance_path(path, Node(value), 1)
+        return True
+
+    def __remove_iterative(self, value) -> bool:
+        path = []
+        node = self.root
+        while node is not None and value != node.value:
+            went_right = value > node.value
+            path.append((node, went_right))
+            node = node.right if went_right else node.left
+
+        if node is None:
+            return False
+
+        if node.left is not None and node.right is not None:
+            # Like __remove: take the value of the neighbour in the higher
+            # subtree, then unlink that neighbour, which has one child at most
+            went_right = node.left.height <= node.right.height
+            path.append((node, went_right))
+            neighbour = node.right if went_right else node.left
+            while (neighbour.left if went_right else neighbour.right) is not None:
+                path.append((neighbour, not went_right))
+                neighbour = neighbour.left if went_right else neighbour.right
+
+            node.value = neighbour.value
+            node = neighbour
+
+        child = node.left if node.right is None else node.right
+        self.__rebalance_path(path, child, -1)
+        return True
+
+    def __rebalance_path(self, path: list, child: Optional[Node], size_delta: int):
+        # Hang child back where the path ended, then update and rebalance the
+        # nodes on the way up, the balanced subtree replacing the old one.
+        # Once a subtree keeps its root and height, the nodes above it only
+        # need their size adjusted.
+        while path:
+            node, went_right = path.pop()
+            if went_right:
+                node.right = child
+            else:
+                node.left = child
+
+            height = node.height
+            self.__update(node)
+            child = self.__balance(node)
+            if child is node and node.height == height:
+                for node, _ in path:
+                    node.size += size_delta
+                return
+
+        self.root = child
+
+    def __build(self, values: list, lo: int, hi: int) -> Optional[Node]:
+        if lo >= hi:
+            return None
+
+        mid = (lo + hi) // 2
+        node = Node(values[mid])
+        node.left = self.__build(values, lo, mid)
+        node.right = self.__build(values, mid + 1, hi)
+        self.__update(node)
+        return node
+
+    def __wrap(self, root: Optional[Node]) -> AVLTree:
+        tree = AVLTree(self.recursive)
+        tree.root = root
+        tree.node_count = 0 if root is None else root.size
+        return tree
+
+    def __set_operation(self, operation, other: AVLTree):
+        if other is self:
+            other = self.copy()
+
+        root = operation(self.root, other.root)
+        self.root = root
+        self.node_count = 0 if root is None else root.size
+        other.root, other.node_count = None, 0
+
+    def __copy(self, node: Optional[Node]) -> Optional[Node]:
+        if node is None:
+            return None
+
+        clone = Node(node.value)
+        clone.left = self.__copy(node.left)
+        clone.right = self.__copy(node.right)
+        clone.bf, clone.height, clone.size = node.bf, node.height, node.size
+        return clone
+
+    def __join(self, left: Optional[Node], node: Node, right: Optional[Node]) -> Node:
+        # Every value of left < node.value < every value of right. The taller
+        # tree is descended along its inner spine down to a subtree about as
+        # high as the other one, node joins the two there and the spine is
+        # rebalanced on the way back up.
+        left_height = -1 if left is None else left.height
+        right_height = -1 if right is None else right.height
+
+        if left_height > right_height + 1:
+            left.right = self.__join(left.right, node, right)
+            self.__update(left)
+            return self.__balance(left)
+        if right_height > left_height + 1:
+            right.left = self.__join(left, node, right.left)
+            self.__update(right)
+            return self.__balance(right)
+
+        node.left, node.right = left, right
+        self.__update(node)
+        return node
+
+    def __join2(self, left: Optional[Node], right: Optional[Node]) -> Optional[Node]:
+        # __join without a middle node, the maximum of left takes its place
+        if left is None:
+            return right
+
+        rest, last = self.__split_last(left)
+        return self.__join(rest, last, right)
+
+    def __split_last(self, node: Node) -> tuple:
+        if node.right is None:
+            rest = node.left
+            node.left = None
+            return rest, node
+
+        rest, last = self.__split_last(node.right)
+        node.right = rest
+        self.__update(node)
+        return self.__balance(node), last
+
+    def __split(self, node: Optional[Node], value) -> tuple:
+        # (values < value, the node holding value or None, values > value)
+        if node is None:
+            return None, None, None
+
+        left, right = node.left, node.right
+        node.left = node.right = None
+        if value < node.value:
+            less, mid, greater = self.__split(left, value)
+            return less, mid, self.__join(greater, node, right)
+        if value > node.value:
+            less, mid, greater = self.__split(right, value)
+            return self.__join(left, node, less), mid, greater
+
+        self.__update(node)
+        return left, node, right
+
+    def __union(self, a: Optional[Node], b: Optional[Node]) -> Optional[Node]:
+        if a is None:
+            return b
+        if b is None:
+            return a
+
+        less, _, greater = self.__split(b, a.value)
+        left, right = a.left, a.right
+        return self.__join(self.__union(left, less), a, self.__union(right, greater))
+
+    def __intersection(self, a: Optional[Node], b: Optional[Node]) -> Optional[Node]:
+        if a is None or b is None:
+            return None
+
+        less, mid, greater = self.__split(b, a.value)
+        left = self.__intersection(a.left, less)
+        right = self.__intersection(a.right, greater)
+        if mid is None:
+            return self.__join2(left, right)
+        return self.__join(left, a, right)
+
+    def __difference(self, a: Optional[Node], b: Optional[Node]) -> Optional[Node]:
+        if a is None or b is None:
+            return a
+
+        less, _, greater = self.__split(a, b.value)
+        left = self.__difference(less, b.left)
+        right = self.__difference(greater, b.right)
+        return self.__join2(left, right)
+
     def __update(self, node: Node):
         left_height = -1 if node.left is None else node.left.height
         right_height = -1 if node.right is None else node.right.height
 
         node.height = 1 + max(left_height, right_height)
+        node.size = (
+            1
+            + (0 if node.left is None else node.left.size)
+            + (0 if node.right is None else node.right.size)
+        )
 
         node.bf = right_height - left_height
 
@@ -161,3 +540,184 @@ class AVLTree:
             node = node.left
 
         return node.value
+
+
+class PooledAVLTree:
+    # The iterative AVLTree engine without node objects: a node is an index
+    # into parallel arrays of left child, right child and height plus a list
+    # of values, about 17 bytes a node besides its value instead of a Node
+    # with its own __dict__. Index 0 is a sentinel empty subtree of height 0,
+    # so leaves have height 1. Removed nodes go on a free-list threaded
+    # through their left slots and are reused by later appends.
+    def __init__(self):
+        self.left = array("i", [0])  # 32 bit indices, up to 2**31 - 1 nodes
+        self.right = array("i", [0])
+        self.heights = array("b", [0])
+        self.values = [None]
+        self.root = 0
+        self.free = 0  # head of the free-list, 0 when empty
+        self.node_count = 0
+
+    def height(self) -> int:
+        # Edges on the longest path like AVLTree.height()
+        return max(self.heights[self.root] - 1, 0)
+
+    def __len__(self) -> int:
+        return self.node_count
+
+    def __contains__(self, value) -> bool:
+        left, right, values = self.left, self.right, self.values
+        node = self.root
+        while node:
+            if value > values[node]:
+                node = right[node]
+            elif value < values[node]:
+                node = left[node]
+            else:
+                return True
+
+        return False
+
+    def __iter__(self) -> Iterator:
+        left, right, values = self.left, self.right, self.values
+        stack, node = [], self.root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = left[node]
+            node = stack.pop()
+            yield values[node]
+            node = right[node]
+
+    def append(self, value) -> bool:
+        if value is None:
+            return False
+
+        left, right, values = self.left, self.right, self.values
+        path = []
+        node = self.root
+        while node:
+            if value > values[node]:
+                path.append((node, True))
+                node = right[node]
+            elif value < values[node]:
+                path.append((node, False))
+                node = left[node]
+            else:
+                return False
+
+        self.__rebalance_path(path, self.__allocate(value))
+        self.node_count += 1
+        return True
+
+    def remove(self, value) -> bool:
+        if value is None:
+            return False
+
+        left, right, values = self.left, self.right, self.values
+        path = []
+        node = self.root
+        while node and value != values[node]:
+            went_right = value > values[node]
+            path.append((node, went_right))
+            node = right[node] if went_right else left[node]
+
+        if not node:
+            return False
+
+        if left[node] and right[node]:
+            went_right = self.heights[left[node]] <= self.heights[right[node]]
+            path.append((node, went_right))
+            neighbour = right[node] if went_right else left[node]
+            while left[neighbour] if went_right else right[neighbour]:
+                path.append((neighbour, not went_right))
+                neighbour = left[neighbour] if went_right else right[neighbour]
+
+            values[node] = values[neighbour]
+            node = neighbour
+
+        child = left[node] or right[node]  # one of them is 0 at most
+        self.__release(node)
+        self.__rebalance_path(path, child)
+        self.node_count -= 1
+        return True
+
+    def __allocate(self, value) -> int:
+        node = self.free
+        if node:
+            self.free = self.left[node]
+            self.left[node] = 0
+            self.heights[node] = 1
+            self.values[node] = value
+        else:
+            node = len(self.values)
+            self.left.append(0)
+            self.right.append(0)
+            self.heights.append(1)
+            self.values.append(value)
+
+        return node
+
+    def __release(self, node: int):
+        self.left[node] = self.free
+        self.right[node] = 0
+        self.heights[node] = 0
+        self.values[node] = None  # drop the reference to the value
+        self.free = node
+
+    def __rebalance_path(self, path: list, child: int):
+        # Same walk as AVLTree.__rebalance_path, without sizes to maintain
+        # there is nothing left to do above a subtree that kept its root
+        # and height
+        left, right, heights = self.left, self.right, self.heights
+        while path:
+            node, went_right = path.pop()
+            if went_right:
+                right[node] = child
+            else:
+                left[node] = child
+
+            height = heights[node]
+            child = self.__balance(node)
+            if child == node and heights[node] == height:
+                return
+
+        self.root = child
+
+    def __balance(self, node: int) -> int:
+        left, right, heights = self.left, self.right, self.heights
+        l, r = left[node], right[node]
+        bf = heights[r] - heights[l]
+        if bf == -2:
+            if heights[right[l]] > heights[left[l]]:
+                left[node] = self.__left_rotate(l)
+            return self.__right_rotate(node)
+        elif bf == 2:
+            if heights[left[r]] > heights[right[r]]:
+                right[node] = self.__right_rotate(r)
+            return self.__left_rotate(node)
+
+        heights[node] = 1 + max(heights[l], heights[r])
+        return node
+
+    def __left_rotate(self, node: int) -> int:
+        left, right, heights = self.left, self.right, self.heights
+        new_parent = right[node]
+        right[node] = left[new_parent]
+        left[new_parent] = node
+
+        heights[node] = 1 + max(heights[left[node]], heights[right[node]])
+        heights[new_parent] = 1 + max(heights[node], heights[right[new_parent]])
+
+        return new_parent
+
+    def __right_rotate(self, node: int) -> int:
+        left, right, heights = self.left, self.right, self.heights
+        new_parent = left[node]
+        left[node] = right[new_parent]
+        right[new_parent] = node
+
+        heights[node] = 1 + max(heights[left[node]], heights[right[node]])
+        heights[new_parent] = 1 + max(heights[node], heights[left[new_parent]])
+
+        return new_parent
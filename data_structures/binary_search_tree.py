@@ -1,5 +1,8 @@
+from __future__ import annotations
 from typing import Optional
 
+from data_structures.tree_queries import TreeQueries
+
 
 class Node:
     def __init__(self, value, /, *, left: Node = None, right: Node = None):
@@ -8,32 +11,104 @@ class Node:
         self.right = right
 
 
-class BinarySearchTree:
-    def __init__(self):
+class BinarySearchTree(TreeQueries):
+    # recursive=True selects the original recursive engine. It recurses once
+    # per level, so it runs out of stack on sorted input, where the tree
+    # degenerates into a list. The default engine uses loops instead.
+    def __init__(self, recursive: bool = False):
         self.root: Optional[Node] = None
         self.node_count = 0
+        self.recursive = recursive
 
     def __len__(self):
         return self.node_count
 
+    def __contains__(self, value) -> bool:
+        # Without it `in` would fall back to a linear scan through __iter__
+        return self.contains(value)
+
     def add(self, value) -> bool:
-        if self.contains(value):
+        if self.recursive:
+            if self.contains(value):
+                return False
+            self.root = self.__do_add(self.root, value)
+        elif not self.__add_iterative(value):
             return False
 
-        self.root = self.__do_add(self.root, value)
         self.node_count += 1
         return True
 
     def remove(self, value) -> bool:
-        if self.contains(value):
+        if self.recursive:
+            if not self.contains(value):
+                return False
             self.root = self.__do_remove(self.root, value)
-            self.node_count -= 1
-            return True
+        elif not self.__remove_iterative(value):
+            return False
 
-        return False
+        self.node_count -= 1
+        return True
 
     def contains(self, value) -> bool:
-        return self.__do_contains(self.root, value)
+        if self.recursive:
+            return self.__do_contains(self.root, value)
+
+        node = self.root
+        while node is not None:
+            if value < node.value:
+                node = node.left
+            elif value > node.value:
+                node = node.right
+            else:
+                return True
+
+        return False
+
+    def __add_iterative(self, value) -> bool:
+        if self.root is None:
+            self.root = Node(value)
+            return True
+
+        node = self.root
+        while True:
+            if value < node.value:
+                if node.left is None:
+                    node.left = Node(value)
+                    return True
+                node = node.left
+            elif value > node.value:
+                if node.right is None:
+                    node.right = Node(value)
+                    return True
+                node = node.right
+            else:
+                return False
+
+    def __remove_iterative(self, value) -> bool:
+        parent, node = None, self.root
+        while node is not None and value != node.value:
+            parent = node
+            node = node.left if value < node.value else node.right
+
+        if node is None:
+            return False
+
+        if node.left is not None and node.right is not None:
+            # Take the successor's value and unlink the successor instead
+            parent, successor = node, node.right
+            while successor.left is not None:
+                parent, successor = successor, successor.left
+            node.value = successor.value
+            node = successor
+
+        child = node.left if node.right is None else node.right
+        if parent is None:
+            self.root = child
+        elif parent.left is node:
+            parent.left = child
+        else:
+            parent.right = child
+        return True
 
     def __do_add(self, node: Optional[Node], value) -> Node:
         if not node:
@@ -0,0 +1,350 @@
+from __future__ import annotations
+from collections.abc import MutableMapping
+from enum import Enum
+import functools
+import sys
+from typing import Callable, Iterator, Optional
+
+from data_structures.hash_table import HashTable, TableType
+
+
+class EvictionPolicy(Enum):
+    LRU = 1
+    LFU = 2
+    CLOCK = 3
+
+
+class Node:
+    __slots__ = ("key", "value", "size", "prev", "next", "owner", "referenced")
+
+    def __init__(self, key, value, size: int):
+        self.key = key
+        self.value = value
+        self.size = size
+        self.prev: Optional[Node] = None
+        self.next: Optional[Node] = None
+        self.owner = None  # the FrequencyNode (LFU) or ring slot (CLOCK)
+        self.referenced = False
+
+
+class LinkedList:
+    # Circular doubly linked list around a sentinel, head is most recent
+    def __init__(self):
+        self.sentinel = Node(None, None, 0)
+        self.sentinel.prev = self.sentinel.next = self.sentinel
+
+    def __bool__(self) -> bool:
+        return self.sentinel.next is not self.sentinel
+
+    def push_front(self, node: Node):
+        node.prev, node.next = self.sentinel, self.sentinel.next
+        self.sentinel.next.prev = node
+        self.sentinel.next = node
+
+    def unlink(self, node: Node):
+        node.prev.next = node.next
+        node.next.prev = node.prev
+        node.prev = node.next = None
+
+    def tail(self) -> Node:
+        return self.sentinel.prev
+
+
+class LRUPolicy:
+    def __init__(self):
+        self.entries = LinkedList()
+
+    def insert(self, node: Node):
+        self.entries.push_front(node)
+
+    def touch(self, node: Node):
+        self.entries.unlink(node)
+        self.entries.push_front(node)
+
+    def remove(self, node: Node):
+        self.entries.unlink(node)
+
+    def victim(self) -> Node:
+        return self.entries.tail()
+
+
+class FrequencyNode:
+    __slots__ = ("freq", "entries", "prev", "next")
+
+    def __init__(self, freq: int):
+        self.freq = freq
+        self.entries = LinkedList()
+        self.prev: Optional[FrequencyNode] = None
+        self.next: Optional[FrequencyNode] = None
+
+
+class LFUPolicy:
+    # The O(1) LFU scheme: an ascending list of frequency nodes, each holding
+    # the entries used exactly that often in LRU order. Ties are broken by
+    # evicting the least recently used entry of the lowest frequency.
+    def __init__(self):
+        self.head: Optional[FrequencyNode] = None
+
+    def insert(self, node: Node):
+        if self.head is None or self.head.freq != 1:
+            freq_node = FrequencyNode(1)
+            freq_node.next = self.head
+            if self.head is not None:
+                self.head.prev = freq_node
+            self.head = freq_node
+
+        node.owner = self.head
+        self.head.entries.push_front(node)
+
+    def touch(self, node: Node):
+        freq_node: FrequencyNode = node.owner
+        next_node = freq_node.next
+        if next_node is None or next_node.freq != freq_node.freq + 1:
+            next_node = FrequencyNode(freq_node.freq + 1)
+            next_node.prev, next_node.next = freq_node, freq_node.next
+            if freq_node.next is not None:
+                freq_node.next.prev = next_node
+            freq_node.next = next_node
+
+        self.remove(node)
+        node.owner = next_node
+        next_node.entries.push_front(node)
+
+    def remove(self, node: Node):
+        freq_node: FrequencyNode = node.owner
+        freq_node.entries.unlink(node)
+        node.owner = None
+        if freq_node.entries:
+            return
+
+        if freq_node.prev is None:
+            self.head = freq_node.next
+        else:
+            freq_node.prev.next = freq_node.next
+        if freq_node.next is not None:
+            freq_node.next.prev = freq_node.prev
+
+    def victim(self) -> Node:
+        return self.head.entries.tail()
+
+
+class ClockPolicy:
+    # Second chance: entries sit in a ring with a referenced bit. The hand
+    # clears bits as it sweeps and evicts the first unreferenced entry.
+    def __init__(self):
+        self.ring: list[Optional[Node]] = []
+        self.free_slots: list[int] = []
+        self.hand = 0
+
+    def insert(self, node: Node):
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.ring[slot] = node
+        else:
+            slot = len(self.ring)
+            self.ring.append(node)
+        node.owner = slot
+        node.referenced = False
+
+    def touch(self, node: Node):
+        node.referenced = True
+
+    def remove(self, node: Node):
+        self.ring[node.owner] = None
+        self.free_slots.append(node.owner)
+        node.owner = None
+
+    def victim(self) -> Node:
+        ring = self.ring
+        while True:
+            if self.hand >= len(ring):
+                self.hand = 0
+            node = ring[self.hand]
+            self.hand += 1
+            if node is None:
+                continue
+            if not node.referenced:
+                return node
+            node.referenced = False
+
+
+POLICIES = {
+    EvictionPolicy.LRU: LRUPolicy,
+    EvictionPolicy.LFU: LFUPolicy,
+    EvictionPolicy.CLOCK: ClockPolicy,
+}
+
+
+def estimate_size(key, value) -> int:
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+class BoundedCache(MutableMapping):
+    # A HashTable that never holds more than max_entries entries or (by the
+    # sizeof estimate) max_bytes bytes, evicting by the chosen policy. Reads
+    # through [] / get() count as hits or misses; `in` does not.
+    def __init__(
+        self,
+        max_entries: int = None,
+        /,
+        *,
+        max_bytes: int = None,
+        policy: EvictionPolicy = EvictionPolicy.LRU,
+        sizeof: Callable = estimate_size,
+        table_type: TableType = TableType.SEPARATE_CHAINING,
+    ):
+        if max_entries is None and max_bytes is None:
+            raise ValueError("Either max_entries or max_bytes needs to be given")
+        if max_entries is not None and max_entries <= 0:
+            raise ValueError("max_entries needs to be greater than 0")
+        if max_bytes is not None and max_bytes <= 0:
+            raise ValueError("max_bytes needs to be greater than 0")
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.sizeof = sizeof
+        self.table = HashTable(table_type=table_type)
+        self.evictor = POLICIES[policy]()
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def clear(self):
+        self.table.clear()
+        self.evictor = POLICIES[self.policy]()
+        self.total_bytes = 0
+
+    def __getitem__(self, key):
+        node = self.table.get(key)
+        if node is None:
+            self.misses += 1
+            raise KeyError(f"No such key found: {key}")
+
+        self.hits += 1
+        self.evictor.touch(node)
+        return node.value
+
+    def __contains__(self, key) -> bool:
+        return key in self.table
+
+    def __setitem__(self, key, value):
+        if key is None:
+            raise ValueError("Key must not be None")
+
+        size = self.sizeof(key, value) if self.max_bytes is not None else 0
+        node = self.table.get(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            # Could never fit, so it is not cached and evicts nothing else.
+            # An older value for the key goes, it would be stale otherwise.
+            if node is not None:
+                self.__remove(node)
+            return
+
+        if node is None:
+            # Make room first, so the new entry is never its own victim (it
+            # would always be the least frequently used one under LFU)
+            self.__evict(1, size)
+            node = Node(key, value, size)
+            self.table[key] = node
+            self.evictor.insert(node)
+        else:
+            self.total_bytes -= node.size
+            node.value, node.size = value, size
+            self.evictor.touch(node)
+        self.total_bytes += size
+
+        # A grown value may push the total over max_bytes
+        self.__evict()
+
+    def __delitem__(self, key):
+        node = self.table.get(key)
+        if node is None:
+            raise KeyError(f"No such key found: {key}")
+
+        self.__remove(node)
+        return node.value
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def __iter__(self) -> Iterator:
+        return iter(self.table)
+
+    def keys(self) -> Iterator:
+        return self.table.keys()
+
+    def values(self) -> Iterator:
+        return (node.value for node in self.table.values())
+
+    def items(self) -> Iterator:
+        return ((key, node.value) for key, node in self.table.items())
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self),
+            "bytes": self.total_bytes,
+        }
+
+    def __evict(self, incoming_entries: int = 0, incoming_bytes: int = 0):
+        max_entries = self.max_entries
+        max_bytes = self.max_bytes
+        while self.table and (
+            (
+                max_entries is not None
+                and len(self.table) + incoming_entries > max_entries
+            )
+            or (max_bytes is not None and self.total_bytes + incoming_bytes > max_bytes)
+        ):
+            self.__remove(self.evictor.victim())
+            self.evictions += 1
+
+    def __remove(self, node: Node):
+        self.evictor.remove(node)
+        del self.table[node.key]
+        self.total_bytes -= node.size
+
+
+# Separates positional from keyword arguments in memoize's cache keys, so
+# f(1, a=2) and f(1, ("a", 2)) do not share an entry
+KWD_MARK = object()
+
+
+def memoize(
+    max_entries: int = 128,
+    /,
+    *,
+    max_bytes: int = None,
+    policy: EvictionPolicy = EvictionPolicy.LRU,
+):
+    """
+    Decorator caching a function's results in a BoundedCache, which is exposed
+    as `wrapped.cache`. Arguments need to be hashable.
+    """
+
+    def decorator(fn):
+        cache = BoundedCache(max_entries, max_bytes=max_bytes, policy=policy)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = args
+            if kwargs:
+                key += (KWD_MARK,) + tuple(sorted(kwargs.items()))
+            try:
+                return cache[key]
+            except KeyError:
+                pass
+
+            value = fn(*args, **kwargs)
+            cache[key] = value
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
@@ -1,20 +1,53 @@
 from __future__ import annotations
-from collections import deque
+from abc import ABC, abstractmethod
+from array import array
+from collections import Counter, deque
 from collections.abc import MutableMapping
 from enum import Enum
+import functools
 import math
-from typing import Iterator, Optional
+import sys
+import threading
+import time
+from typing import Iterable, Iterator, Optional
 
 
 DEFAULT_CAPACITY_SEPARATE_CHAINING = 3
 DEFAULT_CAPACITY_OPEN_ADDRESSING = 8
 DEFAULT_LOAD_FACTOR_SEPARATE_CHAINING = 0.75
 DEFAULT_LOAD_FACTOR_OPEN_ADDRESSING = 0.45
+# OpenAddressing rehashes in place once tombstones take up this share of slots,
+# and shrinks once the keys fill less than this share of its threshold
+MAX_TOMBSTONE_RATIO_OPEN_ADDRESSING = 0.2
+MIN_FILL_RATIO_OPEN_ADDRESSING = 0.25
+DEFAULT_CAPACITY_ROBIN_HOOD = 8
+DEFAULT_LOAD_FACTOR_ROBIN_HOOD = 0.9
+DEFAULT_CAPACITY_COMPACT_CHAINING = 8
+DEFAULT_LOAD_FACTOR_COMPACT_CHAINING = 0.75
+DEFAULT_CAPACITY_INT64 = 16
+DEFAULT_LOAD_FACTOR_INT64 = 0.75
+DEFAULT_SHARD_COUNT = 16
+INT64_MASK = (1 << 64) - 1
+FIBONACCI_MULTIPLIER = 0x9E3779B97F4A7C15  # 2**64 / golden ratio
+# stats() flags a table when its mean probe count exceeds this multiple of what
+# uniform hashing would give, or when this share of keys have a clashing hash()
+PATHOLOGICAL_PROBE_RATIO = 2.0
+PATHOLOGICAL_DUPLICATE_HASH_RATIO = 0.01
 
 
 class TableType(Enum):
     SEPARATE_CHAINING = 1
     OPEN_ADDRESSING = 2
+    ROBIN_HOOD = 3
+    COMPACT_CHAINING = 4
+
+
+# Backends whose lookups never write to the table
+OPTIMISTIC_READ_TABLE_TYPES = (
+    TableType.SEPARATE_CHAINING,
+    TableType.ROBIN_HOOD,
+    TableType.COMPACT_CHAINING,
+)
 
 
 class HashTable(MutableMapping):
@@ -25,23 +58,58 @@ class HashTable(MutableMapping):
         /,
         *,
         table_type: TableType = TableType.SEPARATE_CHAINING,
+        rehash_budget: Optional[int] = None,
+        track_stats: bool = False,
+        probing: ProbingStrategy = None,
     ):
+        # rehash_budget turns on incremental resizing: at most that many
+        # buckets get moved to the grown table per operation.
+        # track_stats records the duration of every resize for stats().
+        # probing picks the OpenAddressing probe sequence, quadratic by default.
+        if probing is not None and table_type != TableType.OPEN_ADDRESSING:
+            raise ValueError("Only OPEN_ADDRESSING tables take a probing strategy")
+        if rehash_budget is not None and table_type not in (
+            TableType.SEPARATE_CHAINING,
+            TableType.OPEN_ADDRESSING,
+        ):
+            raise ValueError(f"{table_type.name} does not support incremental resize")
+
         if table_type == TableType.SEPARATE_CHAINING:
             if capacity is None:
                 capacity = DEFAULT_CAPACITY_SEPARATE_CHAINING
             if max_load_factor is None:
                 max_load_factor = DEFAULT_LOAD_FACTOR_SEPARATE_CHAINING
-            self.table = SeparateChaining(capacity, max_load_factor)
+            self.table = SeparateChaining(capacity, max_load_factor, rehash_budget)
         elif table_type == TableType.OPEN_ADDRESSING:
             if capacity is None:
                 capacity = DEFAULT_CAPACITY_OPEN_ADDRESSING
             if max_load_factor is None:
                 max_load_factor = DEFAULT_LOAD_FACTOR_OPEN_ADDRESSING
-            self.table = OpenAddressing(capacity, max_load_factor)
+            self.table = OpenAddressing(
+                capacity, max_load_factor, rehash_budget, probing
+            )
+        elif table_type == TableType.ROBIN_HOOD:
+            if capacity is None:
+                capacity = DEFAULT_CAPACITY_ROBIN_HOOD
+            if max_load_factor is None:
+                max_load_factor = DEFAULT_LOAD_FACTOR_ROBIN_HOOD
+            self.table = RobinHood(capacity, max_load_factor)
+        elif table_type == TableType.COMPACT_CHAINING:
+            if capacity is None:
+                capacity = DEFAULT_CAPACITY_COMPACT_CHAINING
+            if max_load_factor is None:
+                max_load_factor = DEFAULT_LOAD_FACTOR_COMPACT_CHAINING
+            self.table = CompactChaining(capacity, max_load_factor)
+
+        if track_stats:
+            self.table.resize_log = []
 
     def clear(self):
         self.table.clear()
 
+    def stats(self) -> dict:
+        return self.table.stats()
+
     def __getitem__(self, key):
         return self.table.__getitem__(key)
 
@@ -70,6 +138,68 @@ class HashTable(MutableMapping):
         return self.table.items()
 
 
+def logs_resize(resize_table):
+    # Backends keep resize_log as None unless stats are tracked, then every
+    # resize appends (old capacity, new capacity, seconds) to it.
+    @functools.wraps(resize_table)
+    def wrapper(self, *args):
+        if self.resize_log is None:
+            return resize_table(self, *args)
+
+        old_capacity, start = self.capacity, time.perf_counter()
+        resize_table(self, *args)
+        self.resize_log.append(
+            (old_capacity, self.capacity, time.perf_counter() - start)
+        )
+
+    return wrapper
+
+
+def collect_stats(
+    probe_lengths: Iterable[int],
+    hashes: Iterable[int],
+    capacity: int,
+    expected_probes: float,
+    resize_log: Optional[list],
+    tombstones: int = 0,
+    max_bucket_length: int = None,
+) -> dict:
+    """
+    Summarise a table scan. probe_lengths holds, per key, the number of
+    buckets or slots a lookup of that key inspects and expected_probes the
+    mean uniform hashing would give at the table's load.
+    """
+    histogram = Counter(probe_lengths)
+    size = sum(histogram.values())
+    total_probes = sum(probes * count for probes, count in histogram.items())
+    mean_probes = total_probes / size if size else 0.0
+    duplicate_hashes = size - len(set(hashes))
+
+    warnings = []
+    if size and mean_probes > PATHOLOGICAL_PROBE_RATIO * expected_probes:
+        warnings.append(
+            f"mean probe length {mean_probes:.2f} is far above the "
+            f"{expected_probes:.2f} expected for uniform hashing"
+        )
+    if size and duplicate_hashes > PATHOLOGICAL_DUPLICATE_HASH_RATIO * size:
+        warnings.append(f"{duplicate_hashes} keys share their hash() with another key")
+
+    return {
+        "size": size,
+        "capacity": capacity,
+        "load_factor": size / capacity,
+        "probe_histogram": dict(sorted(histogram.items())),
+        "mean_probes": mean_probes,
+        "max_probes": max(histogram, default=0),
+        "expected_probes": expected_probes,
+        "max_bucket_length": max_bucket_length,
+        "tombstone_ratio": tombstones / capacity,
+        "resizes": None if resize_log is None else list(resize_log),
+        "pathological": bool(warnings),
+        "warnings": warnings,
+    }
+
+
 class Entry:
     def __init__(self, key, value):
         self.key = key
@@ -86,10 +216,13 @@ class Entry:
 
 
 class SeparateChaining(MutableMapping):
+    resize_log: Optional[list] = None
+
     def __init__(
         self,
         capacity: int,
         max_load_factor: float,
+        rehash_budget: Optional[int] = None,
     ):
         if capacity < 0:
             raise ValueError("Capacity needs to be greater than 0")
@@ -97,22 +230,33 @@ class SeparateChaining(MutableMapping):
             raise ValueError(
                 "Max Load Factor needs to be greater than 0 but a real number"
             )
+        if rehash_budget is not None and rehash_budget <= 0:
+            raise ValueError("Rehash budget needs to be greater than 0")
         self.max_load_factor = max_load_factor
+        self.rehash_budget = rehash_budget
         self.capacity = max(capacity, DEFAULT_CAPACITY_SEPARATE_CHAINING)
         self.threshold = int(self.capacity * self.max_load_factor)
         self.table: list[Optional[deque[Entry]]] = [None] * self.capacity
         self.size = 0
 
+        # Only used while an incremental resize is in progress
+        self.old_table: Optional[list[Optional[deque[Entry]]]] = None
+        self.old_capacity = 0
+        self.rehash_index = 0
+
     def clear(self):
-        self.table.clear()
+        self.table = [None] * self.capacity
+        self.old_table = None
         self.size = 0
 
     def __getitem__(self, key):
         if key is None:
             raise KeyError("Key must not be None")
 
-        bucket_index = self.__normalize_index(hash(key))
-        entry = self.__bucket_seek_entry(bucket_index, key)
+        if self.old_table is not None:
+            self.__rehash_step()
+
+        entry = self.__seek_entry(key)
 
         if entry is None:
             raise KeyError(f"No such key found: {key}")
@@ -120,22 +264,47 @@ class SeparateChaining(MutableMapping):
         return entry.value
 
     def __contains__(self, key) -> bool:
-        bucket_index = self.__normalize_index(hash(key))
-        return self.__bucket_seek_entry(bucket_index, key) is not None
+        if self.old_table is not None:
+            self.__rehash_step()
+
+        return self.__seek_entry(key) is not None
 
     def __setitem__(self, key, value):
         if key is None:
             raise ValueError("Key must not be None")
 
+        if self.old_table is not None:
+            self.__rehash_step()
+
         entry = Entry(key, value)
-        bucket_index = self.__normalize_index(hash(entry))
+        if self.old_table is not None:
+            old_index = abs(entry.hash) % self.old_capacity
+            existing_entry = self.__bucket_seek_entry(self.old_table, old_index, key)
+            if existing_entry is not None:
+                old_val = existing_entry.value
+                existing_entry.value = value
+                return old_val
+
+        bucket_index = self.__normalize_index(entry.hash)
         return self.__bucket_insert_entry(bucket_index, entry)
 
     def __delitem__(self, key):
         if key is None:
             raise KeyError("Key must not be None")
-        bucket_index = self.__normalize_index(hash(key))
-        return self.__bucket_remove_entry(bucket_index, key)
+
+        if self.old_table is not None:
+            self.__rehash_step()
+
+        key_hash = hash(key)
+        entry = self.__bucket_remove_entry(
+            self.table, self.__normalize_index(key_hash), key
+        )
+        if entry is None and self.old_table is not None:
+            entry = self.__bucket_remove_entry(
+                self.old_table, abs(key_hash) % self.old_capacity, key
+            )
+
+        return None if entry is None else entry.value
 
     def __iter__(self) -> Iterator:
         return self.keys()
@@ -149,13 +318,39 @@ class SeparateChaining(MutableMapping):
     def items(self) -> Iterator:
         return ((entry.key, entry.value) for entry in self.entries())
 
+    def stats(self) -> dict:
+        tables = [self.table]
+        if self.old_table is not None:
+            tables.append(self.old_table)
+
+        lengths, max_bucket_length = [], 0
+        for table in tables:
+            for bucket in table:
+                if bucket:
+                    lengths.extend(range(1, len(bucket) + 1))
+                    max_bucket_length = max(max_bucket_length, len(bucket))
+
+        return collect_stats(
+            lengths,
+            (entry.hash for entry in self.entries()),
+            self.capacity,
+            1 + self.size / self.capacity / 2,
+            self.resize_log,
+            max_bucket_length=max_bucket_length,
+        )
+
     def entries(self) -> Iterator:
-        for bucket in self.table:
-            if bucket is None:
-                continue
+        tables = [self.table]
+        if self.old_table is not None:
+            tables.append(self.old_table)
 
-            for entry in bucket:
-                yield entry
+        for table in tables:
+            for bucket in table:
+                if bucket is None:
+                    continue
+
+                for entry in bucket:
+                    yield entry
 
     def __len__(self) -> int:
         return self.size
@@ -163,22 +358,33 @@ class SeparateChaining(MutableMapping):
     def __normalize_index(self, key_hash: int) -> int:
         return abs(key_hash) % self.capacity
 
-    def __bucket_remove_entry(self, index, key) -> Optional:
-        entry = self.__bucket_seek_entry(index, key)
+    def __seek_entry(self, key) -> Optional[Entry]:
+        key_hash = hash(key)
+        entry = self.__bucket_seek_entry(
+            self.table, self.__normalize_index(key_hash), key
+        )
+        if entry is None and self.old_table is not None:
+            entry = self.__bucket_seek_entry(
+                self.old_table, abs(key_hash) % self.old_capacity, key
+            )
+
+        return entry
+
+    def __bucket_remove_entry(self, table, index, key) -> Optional[Entry]:
+        entry = self.__bucket_seek_entry(table, index, key)
         if entry is not None:
-            bucket: deque = self.table[index]
+            bucket: deque = table[index]
             bucket.remove(entry)
             self.size -= 1
-            return entry.value
 
-        return None
+        return entry
 
     def __bucket_insert_entry(self, index, entry) -> Optional:
         bucket = self.table[index]
         if bucket is None:
             self.table[index] = bucket = deque()
 
-        existing_entry = self.__bucket_seek_entry(index, entry.key)
+        existing_entry = self.__bucket_seek_entry(self.table, index, entry.key)
         if existing_entry is None:
             bucket.append(entry)
             self.size += 1
@@ -190,11 +396,11 @@ class SeparateChaining(MutableMapping):
             existing_entry.value = entry.value
             return old_val
 
-    def __bucket_seek_entry(self, index, key) -> Optional[Entry]:
+    def __bucket_seek_entry(self, table, index, key) -> Optional[Entry]:
         if key is None:
             raise KeyError("Key must not be None")
 
-        bucket = self.table[index]
+        bucket = table[index]
         if not bucket:
             return None
 
@@ -204,7 +410,11 @@ class SeparateChaining(MutableMapping):
 
         return None
 
+    @logs_resize
     def __resize_table(self):
+        if self.rehash_budget is not None:
+            return self.__start_rehash()
+
         self.capacity *= 2
         self.threshold = int(self.capacity * self.max_load_factor)
         new_table = [None] * self.capacity
@@ -213,38 +423,150 @@ class SeparateChaining(MutableMapping):
             bucket_index = self.__normalize_index(hash(entry.key))
             bucket = new_table[bucket_index]
             if bucket is None:
-                bucket = deque()
+                new_table[bucket_index] = bucket = deque()
             bucket.append(entry)
 
         self.table = new_table
 
+    def __start_rehash(self):
+        # Progressive rehash (as done by Redis): keep the old table around and
+        # move at most `rehash_budget` buckets into the new one per operation.
+        if self.old_table is not None:
+            # We outgrew the new table before the previous move finished
+            self.__rehash_step(self.old_capacity)
+
+        self.old_table, self.old_capacity = self.table, self.capacity
+        self.rehash_index = 0
+
+        self.capacity *= 2
+        self.threshold = int(self.capacity * self.max_load_factor)
+        self.table = [None] * self.capacity
+
+    def __rehash_step(self, budget: int = None):
+        if budget is None:
+            budget = self.rehash_budget
+        old_table, table = self.old_table, self.table
+        # Bound the number of empty buckets we skip over as well
+        empty_visits = budget * 10
+        i = self.rehash_index
+
+        while i < self.old_capacity and budget > 0 and empty_visits > 0:
+            bucket = old_table[i]
+            i += 1
+            if bucket is None:
+                empty_visits -= 1
+                continue
+
+            old_table[i - 1] = None
+            budget -= 1
+            for entry in bucket:
+                bucket_index = self.__normalize_index(entry.hash)
+                new_bucket = table[bucket_index]
+                if new_bucket is None:
+                    table[bucket_index] = new_bucket = deque()
+                new_bucket.append(entry)
+
+        self.rehash_index = i
+        if i >= self.old_capacity:
+            self.old_table = None
+            self.old_capacity = 0
+
 
 TOMBSTONE = object()
 
 
+def mix64(key_hash: int) -> int:
+    # MurmurHash3's 64 bit finalizer, spreads every input bit over the output
+    h = key_hash & INT64_MASK
+    h ^= h >> 33
+    h = (h * 0xFF51AFD7ED558CCD) & INT64_MASK
+    h ^= h >> 33
+    h = (h * 0xC4CEB9FE1A85EC53) & INT64_MASK
+    h ^= h >> 33
+    return h
+
+
+class ProbingStrategy(ABC):
+    # Where OpenAddressing looks for a key: its home slot comes from home(),
+    # the x-th probe after that (x = 1, 2, ...) lands P(x, step) slots further.
+    # step() is computed once per lookup. Capacities are powers of two.
+    def home(self, key_hash: int) -> int:
+        return key_hash
+
+    def step(self, key_hash: int) -> int:
+        return 1
+
+    @abstractmethod
+    def P(self, x: int, step: int) -> int:
+        pass
+
+
+class LinearProbing(ProbingStrategy):
+    # Cache friendly, but clusters badly unless the hash is mixed first
+    def home(self, key_hash: int) -> int:
+        return mix64(key_hash)
+
+    def P(self, x: int, step: int) -> int:
+        return x
+
+
+class QuadraticProbing(ProbingStrategy):
+    # Triangular numbers visit every slot of a power of two table
+    def P(self, x: int, step: int) -> int:
+        return (x * x + x) >> 1
+
+
+class DoubleHashing(ProbingStrategy):
+    # The stride comes from a second hash and is odd, so it is coprime with
+    # the capacity and visits every slot
+    def step(self, key_hash: int) -> int:
+        return mix64(key_hash) | 1
+
+    def P(self, x: int, step: int) -> int:
+        return x * step
+
+
 class OpenAddressing(MutableMapping):
     modification_count = 0
     used_buckets = 0
     key_count = 0
     contains_flag = False
+    resize_log: Optional[list] = None
 
-    def __init__(self, capacity: int, load_factor: float):
+    def __init__(
+        self,
+        capacity: int,
+        load_factor: float,
+        rehash_budget: Optional[int] = None,
+        probing: ProbingStrategy = None,
+    ):
         if capacity < 0:
             raise ValueError("Capacity needs to be greater than 0")
         if load_factor <= 0 or load_factor >= math.inf:
             raise ValueError("Load Factor needs to be greater than 0 but a real number")
+        if rehash_budget is not None and rehash_budget <= 0:
+            raise ValueError("Rehash budget needs to be greater than 0")
 
         self.load_factor = load_factor
+        self.rehash_budget = rehash_budget
+        self.probing = QuadraticProbing() if probing is None else probing
         self.capacity = max(DEFAULT_CAPACITY_OPEN_ADDRESSING, next_2_power(capacity))
         self.threshold = int(self.capacity * self.load_factor)
 
         self.key_table = [None] * self.capacity
         self.value_table = [None] * self.capacity
 
+        # Only used while an incremental resize is in progress
+        self.old_key_table: Optional[list] = None
+        self.old_value_table: Optional[list] = None
+        self.old_capacity = 0
+        self.rehash_index = 0
+
     def clear(self):
         for i in range(self.capacity):
             self.key_table[i] = None
             self.value_table[i] = None
+        self.old_key_table = self.old_value_table = None
         self.key_count = self.used_buckets = 0
         self.modification_count += 1
 
@@ -252,8 +574,151 @@ class OpenAddressing(MutableMapping):
         if key is None:
             raise ValueError("Key must not be None")
 
-        item_hash = self.__normalize_index(hash(key))
-        i, j, x = item_hash, -1, 1
+        if self.old_key_table is not None:
+            self.__rehash_step()
+
+        value = self.__get(key)
+        if not self.contains_flag and self.old_key_table is not None:
+            i = self.__old_slot(key)
+            if i != -1:
+                self.contains_flag = True
+                return self.old_value_table[i]
+
+        return value
+
+    def __setitem__(self, key, value):
+        if key is None:
+            raise ValueError("Key must not be None")
+
+        if self.old_key_table is not None:
+            self.__rehash_step()
+
+        if self.used_buckets >= self.threshold:
+            if self.old_key_table is None and self.key_count < self.threshold // 2:
+                # Mostly tombstones, clearing them frees enough slots
+                self.__compact_table(self.capacity)
+            else:
+                self.__resize_table()
+
+        if self.old_key_table is not None:
+            i = self.__old_slot(key)
+            if i != -1:
+                # Every key lives in exactly one of the tables, move it over
+                old_value = self.old_value_table[i]
+                self.old_key_table[i] = TOMBSTONE
+                self.old_value_table[i] = None
+                self.key_count -= 1
+                self.__insert(key, value)
+                return old_value
+
+        return self.__insert(key, value)
+
+    def __delitem__(self, key):
+        if key is None:
+            raise ValueError("Key must not be None")
+
+        if self.old_key_table is not None:
+            self.__rehash_step()
+
+        key_hash = hash(key)
+        item_hash = self.__normalize_index(self.probing.home(key_hash))
+        step = self.probing.step(key_hash)
+        i, x = item_hash, 0
+
+        while True:
+            if self.key_table[i] is None:
+                break
+
+            if self.key_table[i] == key:
+                self.key_count -= 1
+                self.modification_count += 1
+                old_value = self.value_table[i]
+                self.key_table[i] = TOMBSTONE
+                self.value_table[i] = None
+                if self.old_key_table is None:
+                    self.__maintain_after_delete()
+                return old_value
+
+            x += 1
+            i = self.__normalize_index(item_hash + self.probing.P(x, step))
+
+        if self.old_key_table is not None:
+            i = self.__old_slot(key)
+            if i != -1:
+                self.key_count -= 1
+                self.modification_count += 1
+                old_value = self.old_value_table[i]
+                self.old_key_table[i] = TOMBSTONE
+                self.old_value_table[i] = None
+                return old_value
+
+        return None
+
+    def __contains__(self, key):
+        self.__getitem__(key)
+        return self.contains_flag
+
+    def __len__(self):
+        return self.key_count
+
+    def __iter__(self):
+        return self.keys()
+
+    def keys(self):
+        return (key for key, _ in self.items())
+
+    def values(self):
+        return (value for _, value in self.items())
+
+    def items(self):
+        tables = [(self.key_table, self.value_table)]
+        if self.old_key_table is not None:
+            tables.append((self.old_key_table, self.old_value_table))
+
+        return (
+            (key, value_table[i])
+            for key_table, value_table in tables
+            for i, key in enumerate(key_table)
+            if key is not None and key is not TOMBSTONE
+        )
+
+    def stats(self) -> dict:
+        # Keys still waiting in the old table of an incremental resize are
+        # left out
+        lengths, hashes, tombstones = [], [], 0
+        for i, key in enumerate(self.key_table):
+            if key is TOMBSTONE:
+                tombstones += 1
+            elif key is not None:
+                lengths.append(self.__probe_count(key, i))
+                hashes.append(hash(key))
+
+        # Uniform probing needs ln(1 / (1 - a)) / a probes on a hit, tombstones
+        # occupy slots just like keys do
+        occupancy = self.used_buckets / self.capacity
+        expected = -math.log(1 - occupancy) / occupancy if occupancy else 1.0
+
+        return collect_stats(
+            lengths,
+            hashes,
+            self.capacity,
+            expected,
+            self.resize_log,
+            tombstones=tombstones,
+        )
+
+    @classmethod
+    def P(cls, x: int) -> int:
+        return (x * x + x) >> 1
+
+    def __normalize_index(self, key_hash: int) -> int:
+        return abs(key_hash) % self.capacity
+
+    def __get(self, key):
+        key_hash = hash(key)
+        item_hash = self.__normalize_index(self.probing.home(key_hash))
+        step = self.probing.step(key_hash)
+        i, j, x = item_hash, -1, 0
 
         while True:
             if self.key_table[i] is TOMBSTONE:
@@ -278,17 +743,13 @@ class OpenAddressing(MutableMapping):
                 return None
 
             x += 1
-            i = self.__normalize_index(item_hash + self.P(x))
-
-    def __setitem__(self, key, value):
-        if key is None:
-            raise ValueError("Key must not be None")
+            i = self.__normalize_index(item_hash + self.probing.P(x, step))
 
-        if self.used_buckets >= self.threshold:
-            self.__resize_table()
-
-        item_hash = self.__normalize_index(hash(key))
-        i, j, x = item_hash, -1, 1
+    def __insert(self, key, value):
+        key_hash = hash(key)
+        item_hash = self.__normalize_index(self.probing.home(key_hash))
+        step = self.probing.step(key_hash)
+        i, j, x = item_hash, -1, 0
 
         while True:
             if self.key_table[i] is TOMBSTONE:
@@ -315,88 +776,961 @@ class OpenAddressing(MutableMapping):
                     self.value_table[i] = value
                 else:
                     self.key_count += 1
-                    self.key_table[i] = key
-                    self.value_table[i] = value
+                    self.key_table[j] = key
+                    self.value_table[j] = value
 
                 self.modification_count += 1
                 return None
 
             x += 1
-            i = self.__normalize_index(item_hash + self.P(x))
+            i = self.__normalize_index(item_hash + self.probing.P(x, step))
 
-    def __delitem__(self, key):
+    def __probe_count(self, key, slot: int) -> int:
+        key_hash = hash(key)
+        item_hash = self.__normalize_index(self.probing.home(key_hash))
+        step = self.probing.step(key_hash)
+        i, x, probes = item_hash, 0, 1
+
+        while i != slot:
+            x += 1
+            i = self.__normalize_index(item_hash + self.probing.P(x, step))
+            probes += 1
+
+        return probes
+
+    def __old_slot(self, key) -> int:
+        key_hash = hash(key)
+        old_keys, old_capacity = self.old_key_table, self.old_capacity
+        item_hash = abs(self.probing.home(key_hash)) % old_capacity
+        step = self.probing.step(key_hash)
+        i, x = item_hash, 0
+
+        while old_keys[i] is not None:
+            if old_keys[i] is not TOMBSTONE and old_keys[i] == key:
+                return i
+
+            x += 1
+            i = (item_hash + self.probing.P(x, step)) % old_capacity
+
+        return -1
+
+    @logs_resize
+    def __resize_table(self):
+        if self.rehash_budget is not None:
+            return self.__start_rehash()
+
+        self.__rebuild(self.capacity * 2)
+
+    @logs_resize
+    def __compact_table(self, capacity: int):
+        self.__rebuild(capacity)
+
+    def __maintain_after_delete(self):
+        min_keys = self.threshold * MIN_FILL_RATIO_OPEN_ADDRESSING
+        can_shrink = self.capacity > DEFAULT_CAPACITY_OPEN_ADDRESSING
+        if can_shrink and self.key_count < min_keys:
+            capacity = self.capacity
+            while (
+                capacity > DEFAULT_CAPACITY_OPEN_ADDRESSING
+                and self.key_count
+                < int(capacity * self.load_factor) * MIN_FILL_RATIO_OPEN_ADDRESSING
+            ):
+                capacity //= 2
+            self.__compact_table(capacity)
+        elif (
+            self.used_buckets - self.key_count
+            > self.capacity * MAX_TOMBSTONE_RATIO_OPEN_ADDRESSING
+        ):
+            self.__compact_table(self.capacity)
+
+    def __rebuild(self, capacity: int):
+        # Reinsert every key into fresh tables of the given capacity, which
+        # drops all tombstones
+        self.capacity = capacity
+        self.threshold = int(self.capacity * self.load_factor)
+
+        self.key_table, old_key_table = [None] * self.capacity, self.key_table
+        self.value_table, old_value_table = [None] * self.capacity, self.value_table
+
+        self.key_count = self.used_buckets = 0
+
+        for i in range(len(old_key_table)):
+            key = old_key_table[i]
+            if key is None or key is TOMBSTONE:
+                continue
+
+            self.__insert(key, old_value_table[i])
+            old_key_table[i] = None
+            old_value_table[i] = None
+
+    def __start_rehash(self):
+        # Progressive rehash (as done by Redis): keep the old table around and
+        # move at most `rehash_budget` keys into the new one per operation.
+        # Moved slots become tombstones so probe chains in the old table stay
+        # intact for the keys that have not been moved yet.
+        if self.old_key_table is not None:
+            # We outgrew the new table before the previous move finished
+            self.__rehash_step(self.old_capacity)
+
+        self.old_key_table, self.old_value_table = self.key_table, self.value_table
+        self.old_capacity = self.capacity
+        self.rehash_index = 0
+
+        self.capacity *= 2
+        self.threshold = int(self.capacity * self.load_factor)
+        self.key_table = [None] * self.capacity
+        self.value_table = [None] * self.capacity
+        # key_count keeps counting the keys of both tables
+        self.used_buckets = 0
+
+    def __rehash_step(self, budget: int = None):
+        if budget is None:
+            budget = self.rehash_budget
+        old_keys, old_values = self.old_key_table, self.old_value_table
+        # Bound the number of empty slots we skip over as well
+        empty_visits = budget * 10
+        i = self.rehash_index
+
+        while i < self.old_capacity and budget > 0 and empty_visits > 0:
+            key = old_keys[i]
+            if key is None or key is TOMBSTONE:
+                empty_visits -= 1
+            else:
+                budget -= 1
+                value = old_values[i]
+                old_keys[i] = TOMBSTONE
+                old_values[i] = None
+                self.key_count -= 1
+                self.__insert(key, value)
+            i += 1
+
+        self.rehash_index = i
+        if i >= self.old_capacity:
+            self.old_key_table = self.old_value_table = None
+            self.old_capacity = 0
+
+
+EMPTY = -1
+# Largest distance the "h" distances array can hold, RobinHood switches to "i"
+# beyond it
+MAX_PROBE_DISTANCE = 0x7FFF
+
+
+class RobinHood(MutableMapping):
+    # Linear probing where every slot remembers how far it sits from its home
+    # bucket. An insert that has travelled further than the resident entry
+    # takes its slot and carries the resident on ("robs the rich"), which keeps
+    # probe lengths short and even at high load factors. Deletion shifts the
+    # following run back by one instead of leaving tombstones.
+    resize_log: Optional[list] = None
+
+    def __init__(self, capacity: int, max_load_factor: float):
+        if capacity < 0:
+            raise ValueError("Capacity needs to be greater than 0")
+        if max_load_factor <= 0 or max_load_factor >= 1:
+            raise ValueError("Max Load Factor needs to be between 0 and 1")
+
+        self.max_load_factor = max_load_factor
+        self.capacity = max(DEFAULT_CAPACITY_ROBIN_HOOD, next_2_power(capacity))
+        self.size = 0
+        self.distance_type = "h"
+        self.__allocate()
+
+    def clear(self):
+        self.__allocate()
+        self.size = 0
+
+    def __getitem__(self, key):
+        if key is None:
+            raise KeyError("Key must not be None")
+
+        i = self.__find_slot(key)
+        if i == EMPTY:
+            raise KeyError(f"No such key found: {key}")
+
+        return self.value_table[i]
+
+    def __contains__(self, key) -> bool:
+        if key is None:
+            return False
+
+        return self.__find_slot(key) != EMPTY
+
+    def __setitem__(self, key, value):
         if key is None:
             raise ValueError("Key must not be None")
 
-        item_hash = self.__normalize_index(hash(key))
-        i, x = item_hash, 1
+        if self.size >= self.threshold:
+            self.__resize_table()
 
-        while True:
-            if self.key_table[i] is None:
-                return None
+        key_hash = hash(key)
+        mask = self.mask
+        distances, hashes, keys = self.distances, self.hashes, self.key_table
+        i, dist = ((key_hash * FIBONACCI_MULTIPLIER) & INT64_MASK) >> self.shift, 0
 
-            if self.key_table[i] == key:
-                self.key_count -= 1
-                self.modification_count += 1
+        while True:
+            d = distances[i]
+            if d == EMPTY or d < dist:
+                # Robin Hood invariant: the key would have been placed here or
+                # earlier, so it is not in the table.
+                break
+            if hashes[i] == key_hash and keys[i] == key:
                 old_value = self.value_table[i]
-                self.key_table[i] = TOMBSTONE
-                self.value_table[i] = None
+                self.value_table[i] = value
                 return old_value
 
-            x += 1
-            i = self.__normalize_index(item_hash + self.P(x))
+            dist += 1
+            i = (i + 1) & mask
 
-    def __contains__(self, key):
-        self.__getitem__(key)
-        return self.contains_flag
+        self.__place(i, dist, key_hash, key, value)
+        self.size += 1
+        return None
 
-    def __len__(self):
-        return self.key_count
+    def __delitem__(self, key):
+        if key is None:
+            raise KeyError("Key must not be None")
 
-    def __iter__(self):
+        i = self.__find_slot(key)
+        if i == EMPTY:
+            raise KeyError(f"No such key found: {key}")
+
+        old_value = self.value_table[i]
+        mask = self.mask
+        distances, hashes = self.distances, self.hashes
+        keys, values = self.key_table, self.value_table
+
+        # Backward shift: pull every displaced successor one slot closer to its
+        # home until we reach an empty slot or an entry already at home.
+        j = (i + 1) & mask
+        while distances[j] > 0:
+            distances[i] = distances[j] - 1
+            hashes[i] = hashes[j]
+            keys[i] = keys[j]
+            values[i] = values[j]
+            i, j = j, (j + 1) & mask
+
+        distances[i] = EMPTY
+        hashes[i] = 0
+        keys[i] = values[i] = None
+        self.size -= 1
+        return old_value
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator:
         return self.keys()
 
-    def keys(self):
+    def keys(self) -> Iterator:
+        return (key for key, d in zip(self.key_table, self.distances) if d != EMPTY)
+
+    def values(self) -> Iterator:
         return (
-            key for key in self.key_table if key is not None and key is not TOMBSTONE
+            value for value, d in zip(self.value_table, self.distances) if d != EMPTY
         )
 
-    def values(self):
-        return (value for value in self.value_table if value is not None)
+    def items(self) -> Iterator:
+        return (
+            (self.key_table[i], self.value_table[i])
+            for i, d in enumerate(self.distances)
+            if d != EMPTY
+        )
 
-    def items(self):
+    def stats(self) -> dict:
+        load = self.size / self.capacity
+        return collect_stats(
+            (d + 1 for d in self.distances if d != EMPTY),
+            (h for h, d in zip(self.hashes, self.distances) if d != EMPTY),
+            self.capacity,
+            # Linear probing needs (1 + 1 / (1 - a)) / 2 probes on a hit
+            (1 + 1 / (1 - load)) / 2,
+            self.resize_log,
+        )
+
+    def __allocate(self):
+        self.mask = self.capacity - 1
+        # Home buckets come from Fibonacci hashing of the stored hash, the
+        # low bits alone would send e.g. multiples of a power of two (ints
+        # hash to themselves) into one probe run
+        self.shift = 64 - (self.capacity.bit_length() - 1)
+        self.threshold = int(self.capacity * self.max_load_factor)
+        self.distances = array(self.distance_type, [EMPTY]) * self.capacity
+        self.hashes = array("q", [0]) * self.capacity
+        self.key_table = [None] * self.capacity
+        self.value_table = [None] * self.capacity
+
+    def __find_slot(self, key) -> int:
+        key_hash = hash(key)
+        mask = self.mask
+        distances, hashes, keys = self.distances, self.hashes, self.key_table
+        i, dist = ((key_hash * FIBONACCI_MULTIPLIER) & INT64_MASK) >> self.shift, 0
+
+        while True:
+            d = distances[i]
+            if d == EMPTY or d < dist:
+                return EMPTY
+            if hashes[i] == key_hash and keys[i] == key:
+                return i
+
+            dist += 1
+            i = (i + 1) & mask
+
+    def __place(self, i: int, dist: int, key_hash: int, key, value):
+        mask = self.mask
+        distances, hashes = self.distances, self.hashes
+        keys, values = self.key_table, self.value_table
+
+        while True:
+            d = distances[i]
+            if d == EMPTY:
+                distances[i] = dist
+                hashes[i] = key_hash
+                keys[i] = key
+                values[i] = value
+                return
+            if d < dist:
+                distances[i], dist = dist, d
+                hashes[i], key_hash = key_hash, hashes[i]
+                keys[i], key = key, keys[i]
+                values[i], value = value, values[i]
+
+            dist += 1
+            i = (i + 1) & mask
+            if dist > MAX_PROBE_DISTANCE and self.distance_type == "h":
+                # Runs this long come from keys sharing their whole hash (a
+                # bad __hash__ or hash flooding), which a larger table would
+                # not split up. Growth is left to the load factor, the
+                # distances get wider instead.
+                self.distance_type = "i"
+                self.distances = distances = array("i", distances)
+
+    @logs_resize
+    def __resize_table(self):
+        old_distances, old_hashes = self.distances, self.hashes
+        old_keys, old_values = self.key_table, self.value_table
+
+        self.capacity *= 2
+        self.__allocate()
+
+        shift = self.shift
+        for i, d in enumerate(old_distances):
+            if d == EMPTY:
+                continue
+            key_hash = old_hashes[i]
+            home = ((key_hash * FIBONACCI_MULTIPLIER) & INT64_MASK) >> shift
+            self.__place(home, 0, key_hash, old_keys[i], old_values[i])
+
+
+class CompactChaining(MutableMapping):
+    # Separate chaining without per-entry objects. Entries live at the same
+    # index across parallel arrays, chains link entries by index through
+    # `nexts` and `heads` holds the first entry of every bucket. Freed entry
+    # slots are chained through `nexts` as well and get reused on insert.
+    resize_log: Optional[list] = None
+
+    def __init__(self, capacity: int, max_load_factor: float):
+        if capacity < 0:
+            raise ValueError("Capacity needs to be greater than 0")
+        if max_load_factor <= 0 or max_load_factor >= math.inf:
+            raise ValueError(
+                "Max Load Factor needs to be greater than 0 but a real number"
+            )
+
+        self.max_load_factor = max_load_factor
+        self.capacity = max(DEFAULT_CAPACITY_COMPACT_CHAINING, next_2_power(capacity))
+        self.size = 0
+        self.__allocate()
+
+    def clear(self):
+        self.__allocate()
+        self.size = 0
+
+    def __getitem__(self, key):
+        if key is None:
+            raise KeyError("Key must not be None")
+
+        i = self.__seek(key, hash(key))
+        if i == EMPTY:
+            raise KeyError(f"No such key found: {key}")
+
+        return self.value_list[i]
+
+    def __contains__(self, key) -> bool:
+        if key is None:
+            return False
+
+        return self.__seek(key, hash(key)) != EMPTY
+
+    def __setitem__(self, key, value):
+        if key is None:
+            raise ValueError("Key must not be None")
+
+        key_hash = hash(key)
+        i = self.__seek(key, key_hash)
+        if i != EMPTY:
+            old_value = self.value_list[i]
+            self.value_list[i] = value
+            return old_value
+
+        bucket_index = ((key_hash * FIBONACCI_MULTIPLIER) & INT64_MASK) >> self.shift
+        if self.free != EMPTY:
+            i = self.free
+            self.free = self.nexts[i]
+            self.hashes[i] = key_hash
+            self.nexts[i] = self.heads[bucket_index]
+            self.key_list[i] = key
+            self.value_list[i] = value
+        else:
+            i = len(self.key_list)
+            self.hashes.append(key_hash)
+            self.nexts.append(self.heads[bucket_index])
+            self.key_list.append(key)
+            self.value_list.append(value)
+        self.heads[bucket_index] = i
+
+        self.size += 1
+        if self.size >= self.threshold:
+            self.__resize_table()
+        return None
+
+    def __delitem__(self, key):
+        if key is None:
+            raise KeyError("Key must not be None")
+
+        key_hash = hash(key)
+        bucket_index = ((key_hash * FIBONACCI_MULTIPLIER) & INT64_MASK) >> self.shift
+        hashes, nexts, keys = self.hashes, self.nexts, self.key_list
+        prev, i = EMPTY, self.heads[bucket_index]
+
+        while i != EMPTY:
+            if hashes[i] == key_hash and keys[i] == key:
+                break
+            prev, i = i, nexts[i]
+        else:
+            raise KeyError(f"No such key found: {key}")
+
+        if prev == EMPTY:
+            self.heads[bucket_index] = nexts[i]
+        else:
+            nexts[prev] = nexts[i]
+
+        old_value = self.value_list[i]
+        keys[i] = self.value_list[i] = None
+        nexts[i] = self.free
+        self.free = i
+        self.size -= 1
+        return old_value
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator:
+        return self.keys()
+
+    def keys(self) -> Iterator:
+        return (key for key in self.key_list if key is not None)
+
+    def values(self) -> Iterator:
         return (
-            (key, self.value_table[i])
-            for i, key in enumerate(self.key_table)
-            if key is not None and key is not TOMBSTONE
+            value
+            for key, value in zip(self.key_list, self.value_list)
+            if key is not None
         )
 
-    @classmethod
-    def P(cls, x: int) -> int:
-        return (x * x + x) >> 1
+    def items(self) -> Iterator:
+        return (
+            (key, value)
+            for key, value in zip(self.key_list, self.value_list)
+            if key is not None
+        )
 
-    def __normalize_index(self, key_hash: int) -> int:
-        return abs(key_hash) % self.capacity
+    def stats(self) -> dict:
+        lengths, max_bucket_length = [], 0
+        for i in self.heads:
+            length = 0
+            while i != EMPTY:
+                length += 1
+                i = self.nexts[i]
+            lengths.extend(range(1, length + 1))
+            max_bucket_length = max(max_bucket_length, length)
+
+        return collect_stats(
+            lengths,
+            (h for h, key in zip(self.hashes, self.key_list) if key is not None),
+            self.capacity,
+            1 + self.size / self.capacity / 2,
+            self.resize_log,
+            max_bucket_length=max_bucket_length,
+        )
 
+    def __allocate(self):
+        # Buckets come from Fibonacci hashing of the cached hash, see RobinHood
+        self.shift = 64 - (self.capacity.bit_length() - 1)
+        self.threshold = int(self.capacity * self.max_load_factor)
+        self.heads = array("q", [EMPTY]) * self.capacity
+        self.hashes = array("q")
+        self.nexts = array("q")
+        self.key_list: list = []
+        self.value_list: list = []
+        self.free = EMPTY
+
+    def __seek(self, key, key_hash: int) -> int:
+        hashes, nexts, keys = self.hashes, self.nexts, self.key_list
+        i = self.heads[((key_hash * FIBONACCI_MULTIPLIER) & INT64_MASK) >> self.shift]
+
+        while i != EMPTY:
+            # Cheap integer compare first, only call __eq__ on a hash match
+            if hashes[i] == key_hash:
+                k = keys[i]
+                if k is key or k == key:
+                    return i
+            i = nexts[i]
+
+        return EMPTY
+
+    @logs_resize
     def __resize_table(self):
+        old_hashes, old_keys, old_values = self.hashes, self.key_list, self.value_list
+
         self.capacity *= 2
-        self.threshold = int(self.capacity * self.load_factor)
+        self.__allocate()
+
+        # Rebuilding also compacts away the freed slots. Hashes are cached so
+        # nothing gets rehashed, entries are only relinked.
+        heads, shift = self.heads, self.shift
+        nexts, keys = self.nexts, self.key_list
+        for i, key in enumerate(old_keys):
+            if key is None:
+                continue
+            key_hash = old_hashes[i]
+            bucket_index = ((key_hash * FIBONACCI_MULTIPLIER) & INT64_MASK) >> shift
+            self.hashes.append(key_hash)
+            nexts.append(heads[bucket_index])
+            heads[bucket_index] = len(keys)
+            keys.append(key)
+            self.value_list.append(old_values[i])
 
-        self.key_table, old_key_table = [None] * self.capacity, self.key_table
-        self.value_table, old_value_table = [None] * self.capacity, self.value_table
 
-        self.key_count = self.used_buckets = 0
+FREE_KEY = 0
 
-        for i in range(old_key_table):
-            key = old_key_table[i]
-            if key is None or key is TOMBSTONE:
+
+class Int64HashMap(MutableMapping):
+    # Open addressing map from signed 64 bit ints to floats. Keys and values
+    # are unboxed in array("q") / array("d") buffers, slot 0 of the key space
+    # (FREE_KEY) marks an empty slot and the real key 0 is kept on the side.
+    # Slots are picked by Fibonacci hashing instead of hash(), collisions are
+    # resolved by linear probing and deletion shifts entries back.
+    def __init__(
+        self,
+        capacity: int = DEFAULT_CAPACITY_INT64,
+        max_load_factor: float = DEFAULT_LOAD_FACTOR_INT64,
+    ):
+        if capacity < 0:
+            raise ValueError("Capacity needs to be greater than 0")
+        if max_load_factor <= 0 or max_load_factor >= 1:
+            raise ValueError("Max Load Factor needs to be between 0 and 1")
+
+        self.max_load_factor = max_load_factor
+        self.capacity = max(DEFAULT_CAPACITY_INT64, next_2_power(capacity))
+        self.size = 0
+        self.has_free_key = False
+        self.free_key_value = 0.0
+        self.__allocate()
+
+    def clear(self):
+        self.__allocate()
+        self.size = 0
+        self.has_free_key = False
+        self.free_key_value = 0.0
+
+    def __getitem__(self, key: int) -> float:
+        if key == FREE_KEY:
+            if self.has_free_key:
+                return self.free_key_value
+            raise KeyError(f"No such key found: {key}")
+
+        i = self.__find(key)
+        if i == EMPTY:
+            raise KeyError(f"No such key found: {key}")
+
+        return self.value_table[i]
+
+    def __contains__(self, key) -> bool:
+        if key == FREE_KEY:
+            return self.has_free_key
+
+        return isinstance(key, int) and self.__find(key) != EMPTY
+
+    def __setitem__(self, key: int, value: float):
+        if key == FREE_KEY:
+            old_value = self.free_key_value if self.has_free_key else None
+            self.free_key_value = value
+            if not self.has_free_key:
+                self.has_free_key = True
+                self.size += 1
+            return old_value
+
+        keys, mask = self.key_table, self.mask
+        i = ((key * FIBONACCI_MULTIPLIER) & INT64_MASK) >> self.shift
+
+        while True:
+            k = keys[i]
+            if k == key:
+                old_value = self.value_table[i]
+                self.value_table[i] = value
+                return old_value
+            if k == FREE_KEY:
+                break
+            i = (i + 1) & mask
+
+        # Assign the value first so a bad value does not leave a dangling key
+        self.value_table[i] = value
+        keys[i] = key
+        self.size += 1
+        if self.size >= self.threshold:
+            self.__resize_table(self.capacity * 2)
+        return None
+
+    def __delitem__(self, key: int):
+        if key == FREE_KEY:
+            if not self.has_free_key:
+                raise KeyError(f"No such key found: {key}")
+            self.has_free_key = False
+            self.size -= 1
+            return self.free_key_value
+
+        i = self.__find(key)
+        if i == EMPTY:
+            raise KeyError(f"No such key found: {key}")
+
+        keys, values = self.key_table, self.value_table
+        mask, shift = self.mask, self.shift
+        old_value = values[i]
+        self.size -= 1
+
+        # Backward shift (Knuth's algorithm R): move every later entry of the
+        # run whose home slot is not cyclically in (i, j] into the hole.
+        j = i
+        while True:
+            j = (j + 1) & mask
+            k = keys[j]
+            if k == FREE_KEY:
+                break
+            home = ((k * FIBONACCI_MULTIPLIER) & INT64_MASK) >> shift
+            if (i <= j and (home <= i or home > j)) or (
+                i > j and home <= i and home > j
+            ):
+                keys[i] = k
+                values[i] = values[j]
+                i = j
+
+        keys[i] = FREE_KEY
+        return old_value
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[int]:
+        return self.keys()
+
+    def keys(self) -> Iterator[int]:
+        if self.has_free_key:
+            yield FREE_KEY
+        yield from (key for key in self.key_table if key != FREE_KEY)
+
+    def values(self) -> Iterator[float]:
+        return (value for _, value in self.items())
+
+    def items(self) -> Iterator:
+        if self.has_free_key:
+            yield FREE_KEY, self.free_key_value
+        yield from (
+            (key, value)
+            for key, value in zip(self.key_table, self.value_table)
+            if key != FREE_KEY
+        )
+
+    def get_many(self, keys, default: float = math.nan) -> array:
+        """
+        Look up every key of an int sequence (list, array("q"), NumPy int64
+        array, ...) and return an array("d") of values, missing keys map to
+        default. NumPy callers can wrap the result with numpy.frombuffer.
+        """
+        key_table, value_table = self.key_table, self.value_table
+        mask, shift = self.mask, self.shift
+        has_free_key, free_key_value = self.has_free_key, self.free_key_value
+        out = array("d", [default]) * len(keys)
+
+        # array("q", ...) unboxes NumPy scalars so the mixer works on plain ints
+        for n, key in enumerate(array("q", keys)):
+            if key == FREE_KEY:
+                if has_free_key:
+                    out[n] = free_key_value
                 continue
-            value = old_value_table[i]
 
-            self[key] = value
-            old_key_table[i] = None
-            old_key_table[i] = None
+            i = ((key * FIBONACCI_MULTIPLIER) & INT64_MASK) >> shift
+            while True:
+                k = key_table[i]
+                if k == key:
+                    out[n] = value_table[i]
+                    break
+                if k == FREE_KEY:
+                    break
+                i = (i + 1) & mask
+
+        return out
+
+    def put_many(self, keys, values):
+        """
+        Insert or overwrite keys[n] -> values[n] for two equally long sequences.
+        The table is grown once up front instead of doubling along the way.
+        """
+        keys = array("q", keys)
+        values = array("d", values)
+        if len(keys) != len(values):
+            raise ValueError("keys and values need to have the same length")
+
+        capacity = self.capacity
+        while self.size + len(keys) >= int(capacity * self.max_load_factor):
+            capacity *= 2
+        if capacity != self.capacity:
+            self.__resize_table(capacity)
+
+        key_table, value_table = self.key_table, self.value_table
+        mask, shift = self.mask, self.shift
+        added = 0
+
+        for key, value in zip(keys, values):
+            if key == FREE_KEY:
+                if not self.has_free_key:
+                    self.has_free_key = True
+                    added += 1
+                self.free_key_value = value
+                continue
+
+            i = ((key * FIBONACCI_MULTIPLIER) & INT64_MASK) >> shift
+            while True:
+                k = key_table[i]
+                if k == key:
+                    break
+                if k == FREE_KEY:
+                    key_table[i] = key
+                    added += 1
+                    break
+                i = (i + 1) & mask
+            value_table[i] = value
+
+        self.size += added
+
+    def __allocate(self):
+        self.mask = self.capacity - 1
+        self.shift = 64 - (self.capacity.bit_length() - 1)
+        self.threshold = int(self.capacity * self.max_load_factor)
+        self.key_table = array("q", [FREE_KEY]) * self.capacity
+        self.value_table = array("d", [0.0]) * self.capacity
+
+    def __find(self, key: int) -> int:
+        keys, mask = self.key_table, self.mask
+        i = ((key * FIBONACCI_MULTIPLIER) & INT64_MASK) >> self.shift
+
+        while True:
+            k = keys[i]
+            if k == key:
+                return i
+            if k == FREE_KEY:
+                return EMPTY
+            i = (i + 1) & mask
+
+    def __resize_table(self, capacity: int):
+        old_keys, old_values = self.key_table, self.value_table
+
+        self.capacity = capacity
+        self.__allocate()
+
+        keys, values = self.key_table, self.value_table
+        mask, shift = self.mask, self.shift
+        for key, value in zip(old_keys, old_values):
+            if key == FREE_KEY:
+                continue
+            i = ((key * FIBONACCI_MULTIPLIER) & INT64_MASK) >> shift
+            while keys[i] != FREE_KEY:
+                i = (i + 1) & mask
+            keys[i] = key
+            values[i] = value
+
+
+MISSING = object()
+
+
+class ConcurrentHashTable(MutableMapping):
+    # Keys are spread over a power of two number of independent HashTables
+    # (shards), each guarded by its own lock, so writers only contend when they
+    # hit the same shard. Every write bumps the shard's version before and
+    # after mutating (a seqlock), which lets readers skip the lock: they read
+    # optimistically and retry under the lock if a writer got in between.
+    def __init__(
+        self,
+        shards: int = DEFAULT_SHARD_COUNT,
+        /,
+        *,
+        table_type: TableType = TableType.SEPARATE_CHAINING,
+        capacity: int = None,
+        max_load_factor: float = None,
+    ):
+        if shards <= 0:
+            raise ValueError("Shard count needs to be greater than 0")
+
+        shard_count = 1 << (shards - 1).bit_length()
+        # Pick the shard from the top bits of a mixed hash, the backends index
+        # buckets with the low bits.
+        self.shard_shift = 64 - (shard_count.bit_length() - 1)
+        self.shards = [
+            HashTable(capacity, max_load_factor, table_type=table_type)
+            for _ in range(shard_count)
+        ]
+        self.locks = [threading.Lock() for _ in range(shard_count)]
+        self.versions = [0] * shard_count
+
+        # Lock free reads need reads that never mutate the table (open
+        # addressing moves keys into tombstones on lookup) and a GIL, which is
+        # what makes a torn read detectable instead of undefined.
+        gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+        self.optimistic_reads = (
+            gil_enabled and table_type in OPTIMISTIC_READ_TABLE_TYPES
+        )
+
+    def clear(self):
+        for s in range(len(self.shards)):
+            with self.locks[s]:
+                self.versions[s] += 1
+                self.shards[s].clear()
+                self.versions[s] += 1
+
+    def __getitem__(self, key):
+        s = self.__shard_index(key)
+        table = self.shards[s]
+
+        if self.optimistic_reads:
+            version = self.versions[s]
+            if not version & 1:
+                try:
+                    value = table[key]
+                except KeyError:
+                    value = MISSING
+                except Exception:
+                    # A writer resized the shard underneath us
+                    value = None
+                    version = -1
+                if self.versions[s] == version:
+                    if value is MISSING:
+                        raise KeyError(f"No such key found: {key}")
+                    return value
+
+        with self.locks[s]:
+            return table[key]
+
+    def __contains__(self, key) -> bool:
+        s = self.__shard_index(key)
+        table = self.shards[s]
+
+        if self.optimistic_reads:
+            version = self.versions[s]
+            if not version & 1:
+                try:
+                    found = key in table
+                except Exception:
+                    found = None
+                    version = -1
+                if self.versions[s] == version:
+                    return found
+
+        with self.locks[s]:
+            return key in table
+
+    def __setitem__(self, key, value):
+        s = self.__shard_index(key)
+        with self.locks[s]:
+            self.versions[s] += 1
+            try:
+                return self.shards[s].__setitem__(key, value)
+            finally:
+                self.versions[s] += 1
+
+    def __delitem__(self, key):
+        s = self.__shard_index(key)
+        with self.locks[s]:
+            table = self.shards[s]
+            if key not in table:
+                raise KeyError(f"No such key found: {key}")
+            self.versions[s] += 1
+            try:
+                return table.__delitem__(key)
+            finally:
+                self.versions[s] += 1
+
+    def compute_if_absent(self, key, mapping_function):
+        """
+        Return the value for key, computing and storing mapping_function(key)
+        first if it is missing. The check and the insert happen atomically, so
+        mapping_function runs at most once per key. It runs while holding the
+        shard lock and must not touch this table.
+        """
+        s = self.__shard_index(key)
+        with self.locks[s]:
+            table = self.shards[s]
+            if key in table:
+                return table[key]
+
+            value = mapping_function(key)
+            self.versions[s] += 1
+            try:
+                table[key] = value
+            finally:
+                self.versions[s] += 1
+            return value
+
+    def setdefault(self, key, default=None):
+        return self.compute_if_absent(key, lambda _: default)
+
+    def pop(self, key, default=MISSING):
+        s = self.__shard_index(key)
+        with self.locks[s]:
+            table = self.shards[s]
+            if key not in table:
+                if default is MISSING:
+                    raise KeyError(f"No such key found: {key}")
+                return default
+
+            value = table[key]
+            self.versions[s] += 1
+            try:
+                del table[key]
+            finally:
+                self.versions[s] += 1
+            return value
+
+    def __len__(self) -> int:
+        return sum(len(table) for table in self.shards)
+
+    def __iter__(self) -> Iterator:
+        return self.keys()
+
+    def keys(self) -> Iterator:
+        return (key for key, _ in self.items())
+
+    def values(self) -> Iterator:
+        return (value for _, value in self.items())
+
+    def items(self) -> Iterator:
+        # Weakly consistent: each shard is snapshotted on its own
+        for s, table in enumerate(self.shards):
+            with self.locks[s]:
+                snapshot = list(table.items())
+            yield from snapshot
+
+    def __shard_index(self, key) -> int:
+        return ((hash(key) * FIBONACCI_MULTIPLIER) & INT64_MASK) >> self.shard_shift
 
 
 def next_2_power(num: int) -> int:
-    return math.pow(2, num.bit_length())
+    return 1 << num.bit_length()
@@ -1,26 +1,41 @@
 from array import array
 from collections.abc import MutableMapping
+import random
+import time
 from typing import Iterator
 
+NUMERIC_VALUE_TYPES = (None, "d", "q")
+
+# Degree tuning: candidates, the default add / decrease / poll share of a
+# synthetic trace and its length when degree="auto" has to make one up
+DEFAULT_TUNING_DEGREES = (2, 3, 4, 6, 8, 16)
+DEFAULT_OPERATION_MIX = {"add": 0.3, "decrease": 0.4, "poll": 0.3}
+DEFAULT_TUNING_TRACE_LENGTH = 10_000
+TUNED_DEGREES = {}  # (value_type, degrees) -> pick on the default trace
+
 
 class MinIndexedDHeap(MutableMapping):
-    def __init__(self, degree=2, max_size=16):
+    # With value_type "d" or "q" the values are unboxed floats / signed 64
+    # bit ints in an array instead of a list of objects. degree="auto" picks
+    # the fastest degree on a synthetic trace, see tune_degree().
+    def __init__(self, degree=2, max_size=16, value_type=None):
         if max_size <= 0:
             raise ValueError("max_size <= 0")
+        if value_type not in NUMERIC_VALUE_TYPES:
+            raise ValueError(f"value_type must be one of {NUMERIC_VALUE_TYPES}")
+        if degree == "auto":
+            degree = tune_degree(value_type=value_type)
 
         self.d = max(2, degree)  # 2 is binary heap
-        self.n = max(self.d + 1, max_size)  # max heap size
+        # Initial capacity, doubled whenever a larger key index is added.
+        # Node i has its parent at (i - 1) // d and children from i * d + 1.
+        self.n = max(self.d + 1, max_size)
         self.pm = array("l", (-1 for _ in range(self.n)))  # ki to heap node
         self.im = array("l", (-1 for _ in range(self.n)))  # heap node to ki
-        self.child = array("l", (0 for _ in range(self.n)))  # child for a parent node
-        self.parent = array("l", (0 for _ in range(self.n)))  # parent for a child nodoe
-        self.vals = [None] * self.n  # ki to values
+        self.value_type = value_type
+        self.vals = self.__new_vals(self.n)  # ki to values
         self.sz = 0  # heap size
 
-        for i in range(self.n):
-            self.parent[i] = (i - 1) // self.d
-            self.child[i] = i * self.d + 1
-
     def __len__(self) -> int:
         return self.sz
 
@@ -29,36 +44,44 @@ class MinIndexedDHeap(MutableMapping):
             raise ValueError("Key Index already exists")
         if value is None:
             raise ValueError("Value should not be None")
+        if ki >= self.n:
+            self.__grow(ki)
 
+        # Store the value first, a typed array rejects a wrong type before
+        # the key is linked into the heap
+        self.vals[ki] = value
         i = self.sz
         self.pm[ki] = i
         self.im[i] = ki
-        self.vals[ki] = value
         self.sz += 1
         self.__swim(i)
 
     def __contains__(self, ki: int) -> bool:
         self.__key_in_bounds_or_raise(ki)
-        return self.pm[ki] != -1
+        return ki < self.n and self.pm[ki] != -1
 
     def __delitem__(self, ki: int):
         self.__key_exists_or_throw(ki)
         i = self.pm[ki]
+        self.sz -= 1
         # do heap deletion
-        self.__swap(i, self.sz - 1)
-        self.__sink(i)
-        self.__swim(i)
+        self.__swap(i, self.sz)
 
         # remove the data
         self.pm[ki] = -1
-        self.im[i] = -1
-        value, self.vals[ki] = self.vals[ki], None
-        self.sz -= 1
+        self.im[self.sz] = -1
+        value = self.vals[ki]
+        if self.value_type is None:
+            self.vals[ki] = None
+
+        if i < self.sz:
+            self.__sink(i)
+            self.__swim(i)
         return value
 
     def __setitem__(self, ki: int, value):
         self.__key_exists_and_value_not_none_or_raise(ki, value)
-        i = self.im[ki]
+        i = self.pm[ki]
         old_value, self.vals[ki] = self.vals[ki], value
 
         self.__sink(i)
@@ -77,10 +100,10 @@ class MinIndexedDHeap(MutableMapping):
         return (ki for ki in self.im if ki != -1)
 
     def values(self):
-        return (val for val in self.vals if val is not None)
+        return (self.vals[ki] for ki in self.keys())
 
     def items(self) -> Iterator:
-        return ((ki, val) for ki, val in enumerate(self.vals) if val is not None)
+        return ((ki, self.vals[ki]) for ki in self.keys())
 
     def peek_min_key_index(self) -> int:
         self.__is_not_empty_or_raise()
@@ -119,6 +142,75 @@ class MinIndexedDHeap(MutableMapping):
             self.vals[ki] = value
             self.__swim(self.pm[ki])
 
+    def add_many(self, kis, values):
+        """
+        Add kis[n] with values[n]. Batches at least half the size of the heap
+        are placed unordered and the heap is rebuilt in O(n), smaller ones are
+        added one by one.
+        """
+        kis, values = self.__batch(kis, values)
+        if len(set(kis)) != len(kis) or any(ki in self for ki in kis):
+            raise ValueError("Key Index already exists")
+
+        if len(kis) < self.sz // 2:
+            for ki, value in zip(kis, values):
+                self.add(ki, value)
+            return
+
+        if kis and max(kis) >= self.n:
+            self.__grow(max(kis))
+        pm, im, vals = self.pm, self.im, self.vals
+        for ki, value in zip(kis, values):
+            pm[ki] = self.sz
+            im[self.sz] = ki
+            vals[ki] = value
+            self.sz += 1
+        self.__heapify()
+
+    def decrease_many(self, kis, values):
+        """
+        Lower kis[n] to values[n] where that is a decrease and skip the rest.
+        A key listed several times only gets its lowest value, so every key
+        swims at most once. If at least half the heap changes, the heap is
+        rebuilt in O(n) instead.
+        """
+        kis, values = self.__batch(kis, values)
+        pm, vals, n = self.pm, self.vals, self.n
+        if kis and (min(kis) < 0 or max(kis) >= n or -1 in map(pm.__getitem__, kis)):
+            raise ValueError("Key Index does not exist")
+
+        lowest = {}
+        for ki, value in zip(kis, values):
+            if value < vals[ki] and (ki not in lowest or value < lowest[ki]):
+                lowest[ki] = value
+
+        if lowest and len(lowest) >= self.sz // 2:
+            for ki, value in lowest.items():
+                vals[ki] = value
+            self.__heapify()
+            return
+
+        for ki, value in lowest.items():
+            vals[ki] = value
+            self.__swim(self.pm[ki])
+
+    def __batch(self, kis, values) -> tuple:
+        kis = list(kis)
+        if self.value_type is None:
+            values = list(values)
+            if any(value is None for value in values):
+                raise ValueError("Value should not be None")
+        else:
+            values = array(self.value_type, values)
+        if len(kis) != len(values):
+            raise ValueError("kis and values need to have the same length")
+
+        return kis, values
+
+    def __heapify(self):
+        for i in range((self.sz - 2) // self.d, -1, -1):
+            self.__sink(i)
+
     def __swap(self, i1: int, i2: int):
         # i1 and i2 are heap node indices, not key indices
         k1, k2 = self.im[i1], self.im[i2]
@@ -126,31 +218,452 @@ class MinIndexedDHeap(MutableMapping):
         self.im[i1], self.im[i2] = k2, k1
         self.pm[k1], self.pm[k2] = i2, i1
 
+    # The sifts keep the moving key aside and shift the others into the hole,
+    # it is only written back once at its final node
     def __sink(self, i: int):
-        j = self.__min_child(i)
-        while j != -1:
-            self.__swap(i, j)
-            i, j = j, self.__min_child(j)
+        d, sz, pm, im, vals = self.d, self.sz, self.pm, self.im, self.vals
+        ki = im[i]
+        value = vals[ki]
+        while True:
+            start = i * d + 1
+            if start >= sz:
+                break
+            j, j_value = start, vals[im[start]]
+            for c in range(start + 1, min(start + d, sz)):
+                c_value = vals[im[c]]
+                if c_value < j_value:
+                    j, j_value = c, c_value
+            if not j_value < value:
+                break
+
+            child_ki = im[j]
+            im[i] = child_ki
+            pm[child_ki] = i
+            i = j
+
+        im[i] = ki
+        pm[ki] = i
 
     def __swim(self, i: int):
-        while (
-            self.__value_for_i(i) is not None
-            and self.__value_for_i(self.parent[i]) is not None
-            and self.__value_for_i(i) < self.__value_for_i(self.parent[i])
-        ):
-            self.__swap(i, self.parent[i])
-            i = self.parent[i]
-
-    def __min_child(self, i: int) -> int:
-        start = self.child[i]
-        smallest = -1
-        for idx in range(start, min(start + self.d, self.sz)):
-            if smallest == -1 or self.__value_for_i(idx) < self.__value_for_i(smallest):
-                smallest = idx
-        return smallest
-
-    def __value_for_i(self, i: int):
-        return self.vals[self.im[i]]
+        d, pm, im, vals = self.d, self.pm, self.im, self.vals
+        ki = im[i]
+        value = vals[ki]
+        while i > 0:
+            parent = (i - 1) // d
+            parent_ki = im[parent]
+            if not value < vals[parent_ki]:
+                break
+
+            im[i] = parent_ki
+            pm[parent_ki] = i
+            i = parent
+
+        im[i] = ki
+        pm[ki] = i
+
+    def __grow(self, ki: int):
+        n = self.n
+        while n <= ki:
+            n *= 2
+
+        extra = n - self.n
+        self.pm.extend(array("l", [-1]) * extra)
+        self.im.extend(array("l", [-1]) * extra)
+        self.vals.extend(self.__new_vals(extra))
+        self.n = n
+
+    def __new_vals(self, n: int):
+        if self.value_type is None:
+            return [None] * n
+        return array(self.value_type, [0]) * n
+
+    def __key_in_bounds_or_raise(self, ki: int):
+        if ki < 0:
+            raise ValueError("Invalid key index, must not be negative")
+
+    def __key_exists_or_throw(self, ki: int):
+        if ki not in self:
+            raise ValueError("Key Index does not exist")
+
+    def __is_not_empty_or_raise(self):
+        if not self:
+            raise IndexError("Queue is empty")
+
+    def __key_exists_and_value_not_none_or_raise(self, ki, value):
+        if ki not in self:
+            raise ValueError("Key Index does not exist")
+        if value is None:
+            raise ValueError("Value should not be None")
+
+
+class MinKeyedDHeap(MutableMapping):
+    # MinIndexedDHeap for arbitrary hashable keys. Keys are interned to dense
+    # key indices and the indices of removed keys are handed out again, so
+    # the heap arrays only grow to the most keys ever held at once.
+    def __init__(self, degree=2, max_size=16):
+        self.heap = MinIndexedDHeap(degree, max_size)
+        self.ki_of = {}  # key to ki
+        self.key_of = []  # ki to key
+        self.free_kis = []
+
+    def __len__(self) -> int:
+        return len(self.ki_of)
+
+    def add(self, key, value):
+        if key in self.ki_of:
+            raise ValueError("Key already exists")
+        if value is None:
+            raise ValueError("Value should not be None")
+
+        if self.free_kis:
+            ki = self.free_kis.pop()
+            self.key_of[ki] = key
+        else:
+            ki = len(self.key_of)
+            self.key_of.append(key)
+        self.ki_of[key] = ki
+        self.heap.add(ki, value)
+
+    def __contains__(self, key) -> bool:
+        return key in self.ki_of
+
+    def __delitem__(self, key):
+        ki = self.__ki_or_raise(key)
+        value = self.heap.value_of(ki)
+        del self.heap[ki]
+        self.__release(ki)
+        return value
+
+    def __setitem__(self, key, value):
+        return self.heap.__setitem__(self.__ki_or_raise(key), value)
+
+    def __getitem__(self, key):
+        return self.heap.value_of(self.__ki_or_raise(key))
+
+    def __iter__(self) -> Iterator:
+        return iter(self.ki_of)
+
+    def peek_min_key(self):
+        return self.key_of[self.heap.peek_min_key_index()]
+
+    def poll_min_key(self):
+        ki = self.heap.poll_min_key_index()
+        key = self.key_of[ki]
+        self.__release(ki)
+        return key
+
+    def peek_min_value(self):
+        return self.heap.peek_min_value()
+
+    def poll_min_value(self):
+        value = self.heap.peek_min_value()
+        self.poll_min_key()
+        return value
+
+    def value_of(self, key):
+        return self[key]
+
+    def increase(self, key, value):
+        self.heap.increase(self.__ki_or_raise(key), value)
+
+    def decrease(self, key, value):
+        self.heap.decrease(self.__ki_or_raise(key), value)
+
+    def __release(self, ki: int):
+        del self.ki_of[self.key_of[ki]]
+        self.key_of[ki] = None
+        self.free_kis.append(ki)
+
+    def __ki_or_raise(self, key) -> int:
+        ki = self.ki_of.get(key)
+        if ki is None:
+            raise ValueError("Key does not exist")
+        return ki
+
+
+class MinIndexedRadixHeap(MutableMapping):
+    # Monotone heap for non-negative int values, which may never go below the
+    # last polled minimum (Dijkstra with non-negative integer weights). Bucket
+    # b holds the keys whose value first differs from that minimum in bit
+    # b - 1. decrease() moves a key between buckets in O(1), and polls only
+    # redistribute the bucket that held the new minimum, into lower buckets,
+    # so every key moves at most once per bit of its value.
+    def __init__(self, max_size=16):
+        if max_size <= 0:
+            raise ValueError("max_size <= 0")
+
+        self.n = max_size
+        self.bucket_of = array("l", (-1 for _ in range(self.n)))  # ki to bucket
+        self.pos = array("l", (-1 for _ in range(self.n)))  # ki to bucket slot
+        self.vals = [None] * self.n  # ki to values
+        self.buckets = [[]]
+        self.last = 0  # lower bound for every value in the heap
+        self.sz = 0
+
+    def __len__(self) -> int:
+        return self.sz
+
+    def add(self, ki: int, value):
+        if ki in self:
+            raise ValueError("Key Index already exists")
+        self.__value_in_range_or_raise(value)
+
+        self.vals[ki] = value
+        self.sz += 1
+        self.__link(ki)
+
+    def __contains__(self, ki: int) -> bool:
+        self.__key_in_bounds_or_raise(ki)
+        return self.bucket_of[ki] != -1
+
+    def __delitem__(self, ki: int):
+        self.__key_exists_or_throw(ki)
+        self.__unlink(ki)
+        value, self.vals[ki] = self.vals[ki], None
+        self.sz -= 1
+        return value
+
+    def __setitem__(self, ki: int, value):
+        self.__key_exists_or_throw(ki)
+        self.__value_in_range_or_raise(value)
+
+        self.__unlink(ki)
+        old_value, self.vals[ki] = self.vals[ki], value
+        self.__link(ki)
+
+        return old_value
+
+    def __getitem__(self, ki: int):
+        self.__key_exists_or_throw(ki)
+        return self.vals[ki]
+
+    def __iter__(self) -> Iterator:
+        return (ki for ki in range(self.n) if self.bucket_of[ki] != -1)
+
+    def peek_min_key_index(self) -> int:
+        self.__is_not_empty_or_raise()
+        if not self.buckets[0]:
+            self.__redistribute()
+        return self.buckets[0][-1]
+
+    def poll_min_key_index(self) -> int:
+        min_key = self.peek_min_key_index()
+        del self[min_key]
+        return min_key
+
+    def peek_min_value(self):
+        return self.vals[self.peek_min_key_index()]
+
+    def poll_min_value(self):
+        return self.__delitem__(self.peek_min_key_index())
+
+    def value_of(self, ki: int):
+        return self[ki]
+
+    def increase(self, ki: int, value):
+        self.__key_exists_or_throw(ki)
+        if value > self.vals[ki]:
+            self[ki] = value
+
+    def decrease(self, ki: int, value):
+        self.__key_exists_or_throw(ki)
+        if value < self.vals[ki]:
+            self[ki] = value
+
+    def __redistribute(self):
+        b = 1
+        while not self.buckets[b]:
+            b += 1
+
+        bucket, self.buckets[b] = self.buckets[b], []
+        vals = self.vals
+        self.last = min(vals[ki] for ki in bucket)
+        for ki in bucket:
+            self.__link(ki)
+
+    def __link(self, ki: int):
+        b = (self.vals[ki] ^ self.last).bit_length()
+        while b >= len(self.buckets):
+            self.buckets.append([])
+
+        bucket = self.buckets[b]
+        self.bucket_of[ki] = b
+        self.pos[ki] = len(bucket)
+        bucket.append(ki)
+
+    def __unlink(self, ki: int):
+        # Fill the hole with the bucket's last key
+        bucket = self.buckets[self.bucket_of[ki]]
+        moved = bucket.pop()
+        if moved != ki:
+            i = self.pos[ki]
+            bucket[i] = moved
+            self.pos[moved] = i
+        self.bucket_of[ki] = -1
+
+    def __value_in_range_or_raise(self, value):
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError("Value should be an int")
+        if value < self.last:
+            raise ValueError("Value should not be below the last polled value")
+
+    def __key_in_bounds_or_raise(self, ki: int):
+        if ki < 0 or ki >= self.n:
+            raise ValueError("Invalid key index, must be between 0 and max heap size")
+
+    def __key_exists_or_throw(self, ki: int):
+        if ki not in self:
+            raise ValueError("Key Index does not exist")
+
+    def __is_not_empty_or_raise(self):
+        if not self:
+            raise IndexError("Queue is empty")
+
+
+class MinIndexedPairingHeap(MutableMapping):
+    # Heap ordered multiway tree kept in arrays by key index: child[ki] is the
+    # leftmost child, sibling[ki] the next sibling to the right and prev[ki]
+    # the previous sibling, or the parent for a leftmost child. add() and
+    # decrease() meld a single node or a cut subtree with the root in O(1),
+    # polls pair up the root's children left to right and meld the pairs
+    # right to left in amortized O(log n).
+    def __init__(self, max_size=16):
+        if max_size <= 0:
+            raise ValueError("max_size <= 0")
+
+        self.n = max_size
+        self.child = array("l", (-1 for _ in range(self.n)))
+        self.sibling = array("l", (-1 for _ in range(self.n)))
+        self.prev = array("l", (-1 for _ in range(self.n)))
+        self.vals = [None] * self.n  # ki to values
+        self.root = -1
+        self.sz = 0
+
+    def __len__(self) -> int:
+        return self.sz
+
+    def add(self, ki: int, value):
+        if ki in self:
+            raise ValueError("Key Index already exists")
+        if value is None:
+            raise ValueError("Value should not be None")
+
+        self.vals[ki] = value
+        self.sz += 1
+        self.root = self.__meld(self.root, ki)
+
+    def __contains__(self, ki: int) -> bool:
+        self.__key_in_bounds_or_raise(ki)
+        return self.vals[ki] is not None
+
+    def __delitem__(self, ki: int):
+        self.__key_exists_or_throw(ki)
+        self.__detach(ki)
+        value, self.vals[ki] = self.vals[ki], None
+        self.sz -= 1
+        return value
+
+    def __setitem__(self, ki: int, value):
+        self.__key_exists_and_value_not_none_or_raise(ki, value)
+        old_value = self.vals[ki]
+        if value < old_value:
+            self.decrease(ki, value)
+        else:
+            self.__detach(ki)
+            self.vals[ki] = value
+            self.root = self.__meld(self.root, ki)
+
+        return old_value
+
+    def __getitem__(self, ki: int):
+        self.__key_exists_or_throw(ki)
+        return self.vals[ki]
+
+    def __iter__(self) -> Iterator:
+        return (ki for ki, val in enumerate(self.vals) if val is not None)
+
+    def peek_min_key_index(self) -> int:
+        self.__is_not_empty_or_raise()
+        return self.root
+
+    def poll_min_key_index(self) -> int:
+        min_key = self.peek_min_key_index()
+        del self[min_key]
+        return min_key
+
+    def peek_min_value(self):
+        return self.vals[self.peek_min_key_index()]
+
+    def poll_min_value(self):
+        return self.__delitem__(self.peek_min_key_index())
+
+    def value_of(self, ki: int):
+        return self[ki]
+
+    def increase(self, ki: int, value):
+        self.__key_exists_and_value_not_none_or_raise(ki, value)
+        if value > self.vals[ki]:
+            self[ki] = value
+
+    def decrease(self, ki: int, value):
+        self.__key_exists_and_value_not_none_or_raise(ki, value)
+        if value < self.vals[ki]:
+            self.vals[ki] = value
+            if ki != self.root:
+                self.__cut(ki)
+                self.root = self.__meld(self.root, ki)
+
+    def __meld(self, a: int, b: int) -> int:
+        # a and b are roots, the larger one becomes the leftmost child
+        if a == -1:
+            return b
+        if b == -1:
+            return a
+        if self.vals[b] < self.vals[a]:
+            a, b = b, a
+
+        first = self.child[a]
+        self.sibling[b] = first
+        if first != -1:
+            self.prev[first] = b
+        self.prev[b] = a
+        self.child[a] = b
+        return a
+
+    def __cut(self, ki: int):
+        # Unlink the subtree rooted at ki from its parent and siblings
+        p, s = self.prev[ki], self.sibling[ki]
+        if self.child[p] == ki:
+            self.child[p] = s
+        else:
+            self.sibling[p] = s
+        if s != -1:
+            self.prev[s] = p
+        self.prev[ki] = self.sibling[ki] = -1
+
+    def __detach(self, ki: int):
+        # Take node ki out of the heap, its children stay in
+        if ki != self.root:
+            self.__cut(ki)
+        children = self.__merge_pairs(self.child[ki])
+        self.child[ki] = -1
+        self.root = children if ki == self.root else self.__meld(self.root, children)
+
+    def __merge_pairs(self, first: int) -> int:
+        sibling, prev = self.sibling, self.prev
+        pairs = []
+        while first != -1:
+            a, b = first, sibling[first]
+            first = -1 if b == -1 else sibling[b]
+            sibling[a] = prev[a] = -1
+            if b != -1:
+                sibling[b] = prev[b] = -1
+            pairs.append(self.__meld(a, b))
+
+        root = -1
+        for tree in reversed(pairs):
+            root = self.__meld(tree, root)
+        return root
 
     def __key_in_bounds_or_raise(self, ki: int):
         if ki < 0 or ki >= self.n:
@@ -169,3 +682,146 @@ class MinIndexedDHeap(MutableMapping):
             raise ValueError("Key Index does not exist")
         if value is None:
             raise ValueError("Value should not be None")
+
+
+class CountedValue:
+    # Value wrapper for replays, counts the comparisons made on it
+    __slots__ = ("value", "counter")
+
+    def __init__(self, value, counter: list):
+        self.value = value
+        self.counter = counter
+
+    def __lt__(self, other) -> bool:
+        self.counter[0] += 1
+        return self.value < other.value
+
+    def __gt__(self, other) -> bool:
+        self.counter[0] += 1
+        return self.value > other.value
+
+
+class CountingArray(array):
+    # Stand-in for MinIndexedDHeap.pm in replays. Every sift step moves one
+    # key to a new heap node and writes its pm entry, so writes counts moves.
+    writes = 0
+
+    def __setitem__(self, i, value):
+        self.writes += 1
+        super().__setitem__(i, value)
+
+
+def synthetic_trace(
+    length: int = DEFAULT_TUNING_TRACE_LENGTH,
+    mix: dict = None,
+    seed: int = 0,
+) -> list:
+    """
+    Make up a trace of length operations, picked with the weights in mix
+    (keys "add", "decrease" and "poll"). Values are distinct ints, so every
+    degree polls the keys in the same order and reused key indices are free.
+    """
+    mix = DEFAULT_OPERATION_MIX if mix is None else mix
+    rng = random.Random(seed)
+    ops = list(mix)
+    weights = [mix[op] for op in ops]
+    # The low bits of a value are the operation's position in the trace
+    shift = length.bit_length()
+
+    heap = MinIndexedDHeap()
+    free_kis, next_ki, floor = [], 0, 0
+    trace = []
+    for i, op in enumerate(rng.choices(ops, weights, k=length)):
+        if op == "add" or not heap:
+            if free_kis:
+                ki = free_kis.pop()
+            else:
+                ki, next_ki = next_ki, next_ki + 1
+            value = (floor + rng.randrange(1 << 20)) << shift | i
+            heap.add(ki, value)
+            trace.append(("add", ki, value))
+        elif op == "decrease":
+            ki = rng.choice(heap.im[: heap.sz])
+            value = rng.randint(floor, heap[ki] >> shift) << shift | i
+            heap.decrease(ki, value)
+            trace.append(("decrease", ki, value))
+        else:
+            floor = heap.peek_min_value() >> shift
+            free_kis.append(heap.poll_min_key_index())
+            trace.append(("poll", None, None))
+
+    return trace
+
+
+def replay(trace: list, degree: int, value_type=None, count: bool = False) -> dict:
+    """
+    Run trace on a new MinIndexedDHeap and report its ops_per_sec. With count
+    the values are wrapped to also report comparisons and moves (heap node
+    changes of a key), which makes the run itself much slower.
+    """
+    heap = MinIndexedDHeap(degree, value_type=None if count else value_type)
+    counter = [0]
+    if count:
+        heap.pm = CountingArray("l", heap.pm)
+        trace = [
+            (op, ki, None if value is None else CountedValue(value, counter))
+            for op, ki, value in trace
+        ]
+
+    add, decrease, poll = heap.add, heap.decrease, heap.poll_min_key_index
+    start = time.perf_counter()
+    for op, ki, value in trace:
+        if op == "add":
+            add(ki, value)
+        elif op == "decrease":
+            decrease(ki, value)
+        else:
+            poll()
+    seconds = time.perf_counter() - start
+
+    report = {"ops_per_sec": len(trace) / seconds if seconds else float("inf")}
+    if count:
+        report["comparisons"] = counter[0]
+        report["moves"] = heap.pm.writes
+    return report
+
+
+def benchmark_degrees(
+    trace: list = None,
+    degrees=DEFAULT_TUNING_DEGREES,
+    value_type=None,
+    repeat: int = 3,
+) -> dict:
+    """
+    Replay trace (a list of ("add", ki, value), ("decrease", ki, value) and
+    ("poll", None, None) tuples, synthetic_trace() by default) once per degree
+    and return degree -> {ops_per_sec, comparisons, moves}. ops_per_sec is the
+    best of repeat timed runs. With equal values the polled key can depend on
+    the degree, so recorded traces that reuse key indices need distinct ones.
+    """
+    trace = synthetic_trace() if trace is None else trace
+    results = {}
+    for degree in degrees:
+        report = replay(trace, degree, value_type, count=True)
+        report["ops_per_sec"] = max(
+            replay(trace, degree, value_type)["ops_per_sec"] for _ in range(repeat)
+        )
+        results[degree] = report
+
+    return results
+
+
+def tune_degree(trace: list = None, degrees=DEFAULT_TUNING_DEGREES, value_type=None):
+    """
+    Return the degree with the most ops_per_sec on trace. Without a trace the
+    default synthetic one is used and the answer is cached per value_type.
+    """
+    cache_key = (value_type, tuple(degrees))
+    if trace is None and cache_key in TUNED_DEGREES:
+        return TUNED_DEGREES[cache_key]
+
+    results = benchmark_degrees(trace, degrees, value_type)
+    best = max(results, key=lambda degree: results[degree]["ops_per_sec"])
+    if trace is None:
+        TUNED_DEGREES[cache_key] = best
+    return best
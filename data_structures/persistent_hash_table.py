@@ -0,0 +1,256 @@
+from __future__ import annotations
+from array import array
+from collections.abc import Mapping
+import hashlib
+import mmap
+import os
+import pickle
+import shutil
+import struct
+import sys
+import tempfile
+from typing import Iterable, Iterator
+
+from data_structures.hash_table import OpenAddressing, next_2_power
+
+MAGIC = b"PYHTABLE"
+FORMAT_VERSION = 1
+DEFAULT_LOAD_FACTOR_PERSISTENT = 0.5
+
+# magic, format version, slot width in bytes, capacity, key count
+HEADER = struct.Struct("<8sIIQQ")
+# 64 bit key hash, absolute file offset of the record (0 marks an empty slot)
+SLOT = struct.Struct("<QQ")
+# key length, value length, followed by the key bytes and the pickled value
+RECORD_HEADER = struct.Struct("<II")
+
+
+def encode_key(key) -> bytes:
+    # Keys need an encoding that is identical in every process, which hash()
+    # is not for str/bytes, so only support types with an obvious one.
+    if isinstance(key, bool):
+        raise TypeError("bool keys are not supported")
+    if isinstance(key, str):
+        return b"s" + key.encode("utf-8")
+    if isinstance(key, bytes):
+        return b"b" + key
+    if isinstance(key, int):
+        return b"i" + str(key).encode("ascii")
+    raise TypeError(f"Unsupported key type: {type(key).__name__}")
+
+
+def decode_key(data: bytes):
+    tag, body = data[:1], data[1:]
+    if tag == b"s":
+        return body.decode("utf-8")
+    if tag == b"b":
+        return body
+    return int(body)
+
+
+def stable_hash(key_bytes: bytes) -> int:
+    digest = hashlib.blake2b(key_bytes, digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class PersistentOpenAddressing(Mapping):
+    # Read-only OpenAddressing table living in a memory mapped file:
+    #
+    #   header | capacity slots of (key hash, record offset) | records
+    #
+    # Opening only parses the header, the slots and records are paged in by
+    # the OS when a lookup touches them. Several processes opening the same
+    # file share those pages through the page cache. Keys can be str, bytes
+    # or int, values anything picklable. Files are written with build().
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self.mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.mm) < HEADER.size:
+            self.mm.close()
+            raise ValueError(f"{path} is not a persistent hash table")
+        magic, version, slot_width, capacity, key_count = HEADER.unpack_from(self.mm)
+        if magic != MAGIC or slot_width != SLOT.size:
+            self.mm.close()
+            raise ValueError(f"{path} is not a persistent hash table")
+        if version != FORMAT_VERSION:
+            self.mm.close()
+            raise ValueError(
+                f"Unsupported format version {version}, expected {FORMAT_VERSION}"
+            )
+
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.key_count = key_count
+        # Zero copy view of the slot area, [2 * i] is the hash, [2 * i + 1] the
+        # record offset of slot i
+        self.slots = memoryview(self.mm)[
+            HEADER.size : HEADER.size + capacity * SLOT.size
+        ].cast("Q")
+        if sys.byteorder != "little":
+            # The file is little endian, big endian hosts pay for a copy
+            slots = array("Q", self.slots)
+            slots.byteswap()
+            self.slots.release()
+            self.slots = memoryview(slots)
+
+    @classmethod
+    def build(
+        cls,
+        path: str,
+        items: Iterable,
+        load_factor: float = DEFAULT_LOAD_FACTOR_PERSISTENT,
+    ) -> PersistentOpenAddressing:
+        """
+        Write the (key, value) pairs of items to path and open the result.
+        Records are streamed to a temporary file first, so only the slot
+        table is kept in memory. Later duplicates of a key win. The file is
+        replaced atomically.
+        """
+        if load_factor <= 0 or load_factor >= 1:
+            raise ValueError("Load Factor needs to be between 0 and 1")
+
+        directory = os.path.dirname(os.path.abspath(path))
+        hashes, offsets = array("Q"), array("Q")
+        with tempfile.TemporaryFile(dir=directory) as records:
+            for key, value in items:
+                key_bytes = encode_key(key)
+                value_bytes = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                hashes.append(stable_hash(key_bytes))
+                offsets.append(records.tell())
+                records.write(RECORD_HEADER.pack(len(key_bytes), len(value_bytes)))
+                records.write(key_bytes)
+                records.write(value_bytes)
+
+            capacity = next_2_power(max(1, int(len(hashes) / load_factor)))
+            data_start = HEADER.size + capacity * SLOT.size
+            slots = array("Q", [0]) * (capacity * 2)
+            key_count = cls.__fill_slots(slots, capacity, hashes, offsets, records)
+
+            for i in range(1, len(slots), 2):
+                if slots[i]:
+                    # Stored as relative offset + 1 while filling
+                    slots[i] += data_start - 1
+            if sys.byteorder != "little":
+                slots.byteswap()
+
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as out:
+                out.write(
+                    HEADER.pack(MAGIC, FORMAT_VERSION, SLOT.size, capacity, key_count)
+                )
+                out.write(slots.tobytes())
+                records.seek(0)
+                shutil.copyfileobj(records, out)
+            os.replace(tmp_path, path)
+
+        return cls(path)
+
+    def close(self):
+        self.slots.release()
+        self.mm.close()
+
+    def __enter__(self) -> PersistentOpenAddressing:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getitem__(self, key):
+        offset = self.__find(key)
+        if offset == 0:
+            raise KeyError(f"No such key found: {key}")
+
+        key_len, value_len = RECORD_HEADER.unpack_from(self.mm, offset)
+        start = offset + RECORD_HEADER.size + key_len
+        return pickle.loads(self.mm[start : start + value_len])
+
+    def __contains__(self, key) -> bool:
+        return self.__find(key) != 0
+
+    def __len__(self) -> int:
+        return self.key_count
+
+    def __iter__(self) -> Iterator:
+        return self.keys()
+
+    def keys(self) -> Iterator:
+        return (key for key, _ in self.__records(load_values=False))
+
+    def values(self) -> Iterator:
+        return (value for _, value in self.__records())
+
+    def items(self) -> Iterator:
+        return self.__records()
+
+    def __find(self, key) -> int:
+        try:
+            key_bytes = encode_key(key)
+        except TypeError:
+            return 0
+
+        key_hash = stable_hash(key_bytes)
+        slots, mm, mask = self.slots, self.mm, self.mask
+        i, x = key_hash & mask, 0
+
+        while True:
+            offset = slots[2 * i + 1]
+            if offset == 0:
+                return 0
+            if slots[2 * i] == key_hash:
+                key_len, _ = RECORD_HEADER.unpack_from(mm, offset)
+                start = offset + RECORD_HEADER.size
+                if mm[start : start + key_len] == key_bytes:
+                    return offset
+
+            x += 1
+            i = (key_hash + OpenAddressing.P(x)) & mask
+
+    def __records(self, load_values: bool = True) -> Iterator:
+        mm = self.mm
+        for i in range(self.capacity):
+            offset = self.slots[2 * i + 1]
+            if offset == 0:
+                continue
+
+            key_len, value_len = RECORD_HEADER.unpack_from(mm, offset)
+            start = offset + RECORD_HEADER.size
+            key = decode_key(mm[start : start + key_len])
+            if not load_values:
+                yield key, None
+                continue
+
+            start += key_len
+            yield key, pickle.loads(mm[start : start + value_len])
+
+    @staticmethod
+    def __fill_slots(slots: array, capacity: int, hashes, offsets, records) -> int:
+        mask = capacity - 1
+        key_count = 0
+
+        for key_hash, offset in zip(hashes, offsets):
+            i, x = key_hash & mask, 0
+            while True:
+                stored = slots[2 * i + 1]
+                if stored == 0:
+                    slots[2 * i] = key_hash
+                    slots[2 * i + 1] = offset + 1
+                    key_count += 1
+                    break
+                if slots[2 * i] == key_hash and read_key_bytes(
+                    records, stored - 1
+                ) == read_key_bytes(records, offset):
+                    slots[2 * i + 1] = offset + 1
+                    break
+
+                x += 1
+                i = (key_hash + OpenAddressing.P(x)) & mask
+
+        return key_count
+
+
+def read_key_bytes(records, offset: int) -> bytes:
+    records.seek(offset)
+    key_len, _ = RECORD_HEADER.unpack(records.read(RECORD_HEADER.size))
+    return records.read(key_len)
@@ -1,16 +1,55 @@
+import asyncio
+from collections import deque
+import heapq
+import queue
+import threading
+
+# Without position tracking, removed elements stay in the heap until they reach
+# the root or until they make up this share of it
+LAZY_COMPACTION_RATIO = 0.5
+
+
+class Handle:
+    # Returned by PQueue.append, follows its element around the heap so the
+    # element can be updated or removed without looking it up by value
+    __slots__ = ("index",)
+
+    def __init__(self, index):
+        self.index = index
+
+
 class PQueue:
-    def __init__(self, size=1, elems=None):
-        self.map = {}
+    def __init__(
+        self, size=1, elems=None, track_positions=True, key=None, reverse=False
+    ):
+        # With track_positions=False the heap is a bare list: no value ->
+        # index map is kept up to date on every swap, which makes remove()
+        # lazy and contains() build a value count on first use, and elements
+        # only need to be hashable for those two.
+        # key orders elements by key(elem), computed once per element and kept
+        # in prio next to the heap, reverse turns it into a max heap. heapq
+        # drives the map-free heap unless one of them is given.
+        self.track_positions = track_positions
+        self.key = key
+        self.reverse = reverse
+        self.use_heapq = not track_positions and key is None and not reverse
+        self.map = {}  # value -> handles of its copies
+        self.handles = []  # heap node -> handle, only with track_positions
+        self.removed = {}  # value -> copies marked removed, still in the heap
+        self.removed_count = 0
+        self.counts = None  # value -> live copies, only once remove/contains ran
+
         if elems:
             self.heap_size = len(elems)
             self.heap = [e for e in elems]
-            for i, e in enumerate(elems):
-                self.__map_add(e, i)
-
-            sink_start = max(0, self.heap_size / 2 - 1)
-            for i in range(sink_start, -1, -1):
-                self.__sink(i)
-
+            self.prio = self.heap if key is None else [None] * self.heap_size
+            if track_positions:
+                self.handles = [None] * self.heap_size
+                self.__heapify(0)
+            else:
+                if key is not None:
+                    self.prio[:] = map(key, self.heap)
+                self.__build_free()
             return
 
         if not isinstance(size, int):
@@ -19,47 +58,212 @@ class PQueue:
             raise ValueError("Size must be greater than 0")
 
         self.heap_size = 0
-        self.heap = [None] * size
+        self.heap = [None] * size if track_positions else []
+        self.handles = [None] * size if track_positions else []
+        # heap node -> key(elem), or the heap itself without a key
+        self.prio = self.heap if key is None else [None] * len(self.heap)
 
     def __len__(self):
-        return self.heap_size
+        return self.heap_size - self.removed_count
 
     def clear(self):
-        for i in range(len(self.heap)):
-            self.heap[i] = None
+        if self.track_positions:
+            for i in range(len(self.heap)):
+                self.heap[i] = None
+                self.handles[i] = None
+                self.prio[i] = None
+        else:
+            self.heap.clear()
+            self.prio.clear()
         self.heap_size = 0
         self.map.clear()
+        self.removed.clear()
+        self.removed_count = 0
+        self.counts = None
 
     def peek(self):
-        if self.heap:
+        if self.removed_count:
+            self.__purge_root()
+
+        if self.heap_size:
             return self.heap[0]
 
         return None
 
     def poll(self):
-        return self.__remove_at(0)
+        if self.track_positions:
+            return self.__remove_at(0)
+
+        if self.removed_count:
+            self.__purge_root()
+        if not self.heap_size:
+            return None
+
+        elem = self.__pop_free()
+        self.heap_size -= 1
+        if self.counts is not None:
+            self.__count_remove(elem)
+        return elem
 
     def contains(self, elem):
-        return elem in self.map
+        if self.track_positions:
+            return elem in self.map
+
+        return self.__live_counts().get(elem, 0) > 0
 
     def append(self, elem):
+        """
+        Add elem and return a Handle for update() / remove(), or None without
+        track_positions.
+        """
         if elem is None:
             raise ValueError("elem should not be None")
 
+        if not self.track_positions:
+            if self.use_heapq:
+                heapq.heappush(self.heap, elem)
+            else:
+                self.heap.append(elem)
+                if self.key is not None:
+                    self.prio.append(self.key(elem))
+                self.__sift_up_free(self.heap_size)
+            self.heap_size += 1
+            if self.counts is not None:
+                self.counts[elem] = self.counts.get(elem, 0) + 1
+            return None
+
+        handle = Handle(self.heap_size)
         if self.heap_size < len(self.heap):
             self.heap[self.heap_size] = elem
+            self.handles[self.heap_size] = handle
+            if self.key is not None:
+                self.prio[self.heap_size] = self.key(elem)
         else:
             self.heap.append(elem)
+            self.handles.append(handle)
+            if self.key is not None:
+                self.prio.append(self.key(elem))
 
-        self.__map_add(elem, self.heap_size)
+        self.__map_add(elem, handle)
 
         self.__swim(self.heap_size)
         self.heap_size += 1
+        return handle
+
+    def update(self, handle, elem):
+        """
+        Replace the element behind handle with elem (its new priority, higher
+        or lower) in O(log n). The handle stays valid.
+        """
+        if elem is None:
+            raise ValueError("elem should not be None")
+        i = self.__handle_index_or_raise(handle)
+
+        self.__map_remove(self.heap[i], handle)
+        self.heap[i] = elem
+        if self.key is not None:
+            self.prio[i] = self.key(elem)
+        self.__map_add(elem, handle)
+
+        self.__sink(i)
+        if self.heap[i] is elem:
+            self.__swim(i)
+
+    def push_many(self, elems):
+        """
+        Add every element of an iterable. Batches at least half the size of
+        the heap are appended unordered and the whole heap is rebuilt in O(n),
+        smaller ones are sifted in one by one.
+        """
+        elems = list(elems)
+        if any(elem is None for elem in elems):
+            raise ValueError("elem should not be None")
+
+        if len(elems) < self.heap_size // 2:
+            for elem in elems:
+                self.append(elem)
+            return
+
+        start = self.heap_size
+        del self.heap[start:]
+        self.heap.extend(elems)
+        self.heap_size = len(self.heap)
+        if self.track_positions:
+            del self.handles[start:]
+            self.handles.extend([None] * len(elems))
+            if self.key is not None:
+                del self.prio[start:]
+                self.prio.extend([None] * len(elems))
+            self.__heapify(start)
+            return
+
+        if self.key is not None:
+            del self.prio[start:]
+            self.prio.extend(map(self.key, elems))
+        self.__build_free()
+        if self.counts is not None:
+            for elem in elems:
+                self.counts[elem] = self.counts.get(elem, 0) + 1
+
+    def poll_many(self, k):
+        """
+        Remove and return the k smallest elements in order (fewer if the heap
+        runs out).
+        """
+        return [self.poll() for _ in range(min(k, len(self)))]
+
+    def pushpop(self, elem):
+        """
+        Push elem, then poll, with at most one sift. Returns elem right away
+        when it would be the smallest anyway.
+        """
+        if elem is None:
+            raise ValueError("elem should not be None")
+
+        if self.removed_count:
+            self.__purge_root()
+        if self.heap_size == 0:
+            return elem
+        elem_key = elem if self.key is None else self.key(elem)
+        root_key = self.prio[0]
+        if (root_key <= elem_key) if self.reverse else (elem_key <= root_key):
+            return elem
+
+        return self.__replace_root(elem, elem_key)
+
+    def replace(self, elem):
+        """
+        Poll, then push elem, with a single sift. Unlike pushpop the returned
+        element can be larger than elem. Returns None on an empty heap.
+        """
+        if elem is None:
+            raise ValueError("elem should not be None")
+
+        if self.removed_count:
+            self.__purge_root()
+        if self.heap_size == 0:
+            self.append(elem)
+            return None
+
+        elem_key = elem if self.key is None else self.key(elem)
+        return self.__replace_root(elem, elem_key)
 
     def remove(self, elem):
+        """
+        Remove elem, or the element behind a Handle from append(), in
+        O(log n). Returns whether anything was removed.
+        """
         if elem is None:
             return False
 
+        if isinstance(elem, Handle):
+            i = self.__handle_index_or_raise(elem)
+            self.__remove_at(i)
+            return True
+
+        if not self.track_positions:
+            return self.__lazy_remove(elem)
+
         i = self.__map_get(elem)
         if i is not None:
             self.__remove_at(i)
@@ -68,9 +272,9 @@ class PQueue:
 
     def is_min_heap(self, k=0):
         if not isinstance(k, int):
-            return TypeError("k must be int")
+            raise TypeError("k must be int")
         if k < 0:
-            return ValueError("k must be a positive integer")
+            raise ValueError("k must be a positive integer")
 
         if k >= self.heap_size:
             return True
@@ -78,16 +282,18 @@ class PQueue:
         left = 2 * k + 1
         right = 2 * k + 2
 
-        if left < self.heap_size and self.__less(k, left):
+        if left < self.heap_size and not self.__less(k, left):
             return False
-        if right < self.heap_size and self.__less(k, right):
+        if right < self.heap_size and not self.__less(k, right):
             return False
 
         return self.is_min_heap(left) and self.is_min_heap(right)
 
     def __less(self, i, j):
-        node_i = self.heap[i]
-        node_j = self.heap[j]
+        node_i = self.prio[i]
+        node_j = self.prio[j]
+        if self.reverse:
+            return node_j <= node_i
         return node_i <= node_j
 
     def __swim(self, k):
@@ -105,7 +311,7 @@ class PQueue:
             smallest = left
 
             if right < self.heap_size and self.__less(right, left):
-                smallest = left
+                smallest = right
 
             if left >= self.heap_size or self.__less(k, smallest):
                 break
@@ -113,23 +319,216 @@ class PQueue:
             self.__swap(smallest, k)
             k = smallest
 
+    def __heapify(self, start):
+        # Floyd's bottom up construction, O(n). Elements from start on are new
+        # and get handles and keys first. Handles and keys move along with
+        # their elements, handles learn their final index at the end instead
+        # of on every move.
+        heap, handles, prio, n = self.heap, self.handles, self.prio, self.heap_size
+        key, reverse = self.key, self.reverse
+        for i in range(start, n):
+            handles[i] = Handle(i)
+            self.__map_add(heap[i], handles[i])
+            if key is not None:
+                prio[i] = key(heap[i])
+
+        for k in range(n // 2 - 1, -1, -1):
+            elem, handle, elem_key = heap[k], handles[k], prio[k]
+            while True:
+                child = 2 * k + 1
+                if child >= n:
+                    break
+                if child + 1 < n and (
+                    prio[child] < prio[child + 1]
+                    if reverse
+                    else prio[child + 1] < prio[child]
+                ):
+                    child += 1
+                if not (elem_key < prio[child] if reverse else prio[child] < elem_key):
+                    break
+                heap[k], handles[k] = heap[child], handles[child]
+                if key is not None:
+                    prio[k] = prio[child]
+                k = child
+            heap[k], handles[k] = elem, handle
+            if key is not None:
+                prio[k] = elem_key
+
+        for i in range(n):
+            handles[i].index = i
+
+    def __replace_root(self, elem, elem_key):
+        if not self.track_positions:
+            if self.use_heapq:
+                root = heapq.heapreplace(self.heap, elem)
+            else:
+                root = self.heap[0]
+                self.heap[0] = elem
+                self.prio[0] = elem_key
+                self.__sift_down_free(0)
+            if self.counts is not None:
+                self.counts[elem] = self.counts.get(elem, 0) + 1
+                self.__count_remove(root)
+            return root
+
+        root, root_handle = self.heap[0], self.handles[0]
+        self.__map_remove(root, root_handle)
+        root_handle.index = -1
+
+        handle = Handle(0)
+        self.heap[0], self.handles[0] = elem, handle
+        if self.key is not None:
+            self.prio[0] = elem_key
+        self.__map_add(elem, handle)
+        self.__sink(0)
+        return root
+
+    def __lazy_remove(self, elem):
+        counts = self.__live_counts()
+        if not counts.get(elem):
+            return False
+
+        self.__count_remove(elem)
+        self.removed[elem] = self.removed.get(elem, 0) + 1
+        self.removed_count += 1
+        if self.removed_count > self.heap_size * LAZY_COMPACTION_RATIO:
+            self.__compact()
+        return True
+
+    def __purge_root(self):
+        # Drop elements marked removed as soon as they surface at the root
+        heap, removed = self.heap, self.removed
+        while self.heap_size and heap[0] in removed:
+            elem = self.__pop_free()
+            self.heap_size -= 1
+            self.removed_count -= 1
+            if removed[elem] == 1:
+                del removed[elem]
+            else:
+                removed[elem] -= 1
+
+    def __compact(self):
+        removed, live, live_prio = self.removed, [], []
+        for elem, elem_key in zip(self.heap, self.prio):
+            if removed.get(elem):
+                removed[elem] -= 1
+            else:
+                live.append(elem)
+                live_prio.append(elem_key)
+
+        self.heap[:] = live  # in place, prio may refer to the same list
+        if self.key is not None:
+            self.prio[:] = live_prio
+        self.heap_size = len(live)
+        self.__build_free()
+        self.removed.clear()
+        self.removed_count = 0
+
+    # Map-free heap: heapq when elements are their own priority in a min
+    # heap, otherwise hole-based sifts over heap and prio like __heapify
+    def __build_free(self):
+        if self.use_heapq:
+            heapq.heapify(self.heap)
+            return
+
+        for k in range(len(self.heap) // 2 - 1, -1, -1):
+            self.__sift_down_free(k)
+
+    def __pop_free(self):
+        heap, prio = self.heap, self.prio
+        if self.use_heapq:
+            return heapq.heappop(heap)
+
+        last = heap.pop()
+        last_key = last if self.key is None else prio.pop()
+        if not heap:
+            return last
+
+        root = heap[0]
+        heap[0] = last
+        prio[0] = last_key
+        self.__sift_down_free(0)
+        return root
+
+    def __sift_up_free(self, k):
+        heap, prio, reverse = self.heap, self.prio, self.reverse
+        elem, elem_key = heap[k], prio[k]
+        while k > 0:
+            parent = (k - 1) // 2
+            if not (prio[parent] < elem_key if reverse else elem_key < prio[parent]):
+                break
+            heap[k] = heap[parent]
+            prio[k] = prio[parent]
+            k = parent
+        heap[k] = elem
+        prio[k] = elem_key
+
+    def __sift_down_free(self, k):
+        heap, prio, reverse = self.heap, self.prio, self.reverse
+        n = len(heap)
+        elem, elem_key = heap[k], prio[k]
+        while True:
+            child = 2 * k + 1
+            if child >= n:
+                break
+            if child + 1 < n and (
+                prio[child] < prio[child + 1]
+                if reverse
+                else prio[child + 1] < prio[child]
+            ):
+                child += 1
+            if not (elem_key < prio[child] if reverse else prio[child] < elem_key):
+                break
+            heap[k] = heap[child]
+            prio[k] = prio[child]
+            k = child
+        heap[k] = elem
+        prio[k] = elem_key
+
+    def __live_counts(self):
+        if self.counts is None:
+            counts = {}
+            for elem in self.heap:
+                counts[elem] = counts.get(elem, 0) + 1
+            for elem, copies in self.removed.items():
+                counts[elem] -= copies
+                if not counts[elem]:
+                    del counts[elem]
+            self.counts = counts
+
+        return self.counts
+
+    def __count_remove(self, elem):
+        if self.counts[elem] == 1:
+            del self.counts[elem]
+        else:
+            self.counts[elem] -= 1
+
     def __swap(self, i, j):
-        i_elem, j_elem = self.heap[i], self.heap[j]
-        self.heap[i], self.heap[j] = j_elem, i_elem
-        self.__map_swap(i_elem, j_elem, i, j)
+        heap, handles = self.heap, self.handles
+        heap[i], heap[j] = heap[j], heap[i]
+        handles[i], handles[j] = handles[j], handles[i]
+        if self.key is not None:
+            prio = self.prio
+            prio[i], prio[j] = prio[j], prio[i]
+        handles[i].index = i
+        handles[j].index = j
 
     def __remove_at(self, i):
-        if not self.heap:
+        if self.heap_size == 0:
             return None
 
         self.heap_size -= 1
-        removed_data = self.heap[i]
+        removed_data, removed_handle = self.heap[i], self.handles[i]
         self.__swap(i, self.heap_size)
 
         self.heap[self.heap_size] = None
-        self.__map_remove(removed_data, self.heap_size)
+        self.handles[self.heap_size] = None
+        self.prio[self.heap_size] = None
+        self.__map_remove(removed_data, removed_handle)
+        removed_handle.index = -1
 
-        if i is self.heap_size:
+        if i == self.heap_size:
             return removed_data
 
         elem = self.heap[i]
@@ -141,26 +540,205 @@ class PQueue:
 
         return removed_data
 
-    def __map_add(self, value, index):
-        indices = self.map.get(value, set())
-        indices.add(index)
-        self.map[value] = indices
-
-    def __map_remove(self, value, index):
-        indices = self.map[value]
-        indices.remove(index)
-        if not indices:
+    def __handle_index_or_raise(self, handle):
+        if not self.track_positions:
+            raise TypeError("Handles need track_positions=True")
+        i = handle.index
+        if i < 0 or i >= self.heap_size or self.handles[i] is not handle:
+            raise ValueError("Handle is not in this queue")
+        return i
+
+    def __map_add(self, value, handle):
+        handles = self.map.get(value, set())
+        handles.add(handle)
+        self.map[value] = handles
+
+    def __map_remove(self, value, handle):
+        handles = self.map[value]
+        handles.remove(handle)
+        if not handles:
             del self.map[value]
 
     def __map_get(self, value):
         if value in self.map:
-            return self.map[value][-1]
+            return next(iter(self.map[value])).index
 
         return None
 
-    def __map_swap(self, i_elem, j_elem, i, j):
-        self.map[i_elem].remove(i)
-        self.map[i_elem].remove(j)
 
-        self.map[j_elem].remove(j)
-        self.map[j_elem].remove(i)
+class AsyncPQueue:
+    # asyncio.Queue look-alike handing out the smallest element first. The
+    # heap is a map-free PQueue, all access happens on the event loop thread.
+    # maxsize <= 0 means unbounded, otherwise put() waits for room.
+    def __init__(self, maxsize=0, elems=None):
+        self.maxsize = maxsize
+        self.pq = PQueue(elems=elems, track_positions=False)
+        self.getters = deque()
+        self.putters = deque()
+
+    def __len__(self):
+        return len(self.pq)
+
+    def qsize(self):
+        return len(self.pq)
+
+    def empty(self):
+        return not self.pq
+
+    def full(self):
+        return 0 < self.maxsize <= len(self.pq)
+
+    async def put(self, elem):
+        while self.full():
+            await self.__wait(self.putters, self.full)
+        self.put_nowait(elem)
+
+    def put_nowait(self, elem):
+        if self.full():
+            raise asyncio.QueueFull
+        self.pq.append(elem)
+        self.__wakeup_next(self.getters)
+
+    async def get(self):
+        while self.empty():
+            await self.__wait(self.getters, self.empty)
+        return self.get_nowait()
+
+    def get_nowait(self):
+        if self.empty():
+            raise asyncio.QueueEmpty
+        elem = self.pq.poll()
+        self.__wakeup_next(self.putters)
+        return elem
+
+    async def __wait(self, waiters, blocked):
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        try:
+            await waiter
+        except BaseException:
+            waiter.cancel()
+            try:
+                waiters.remove(waiter)
+            except ValueError:
+                pass
+            # We were woken up and cancelled at once, pass the wakeup on
+            if not blocked() and not waiter.cancelled():
+                self.__wakeup_next(waiters)
+            raise
+
+    @staticmethod
+    def __wakeup_next(waiters):
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+
+class ConcurrentPQueue:
+    # Thread safe queue.PriorityQueue look-alike over a map-free PQueue.
+    # put_many() and drain() move whole batches under a single lock
+    # acquisition. maxsize <= 0 means unbounded.
+    def __init__(self, maxsize=0, elems=None):
+        self.maxsize = maxsize
+        self.pq = PQueue(elems=elems, track_positions=False)
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+        # put_many() callers waiting for room, a single notify could wake one
+        # of them instead of a put() that fits
+        self.batch_putters = 0
+
+    def __len__(self):
+        with self.lock:
+            return len(self.pq)
+
+    def qsize(self):
+        return len(self)
+
+    def empty(self):
+        return not len(self)
+
+    def full(self):
+        with self.lock:
+            return 0 < self.maxsize <= len(self.pq)
+
+    def put(self, elem, block=True, timeout=None):
+        with self.not_full:
+            self.__wait(self.not_full, self.__not_full, block, timeout, queue.Full)
+            self.pq.append(elem)
+            self.not_empty.notify()
+
+    def put_nowait(self, elem):
+        self.put(elem, block=False)
+
+    def put_many(self, elems, block=True, timeout=None):
+        """
+        Add all of elems at once, waiting until there is room for the whole
+        batch.
+        """
+        elems = list(elems)
+        if 0 < self.maxsize < len(elems):
+            raise ValueError("Batch is larger than maxsize")
+
+        with self.not_full:
+            self.batch_putters += 1
+            try:
+                self.__wait(
+                    self.not_full,
+                    lambda: self.__has_room(len(elems)),
+                    block,
+                    timeout,
+                    queue.Full,
+                )
+            finally:
+                self.batch_putters -= 1
+            self.pq.push_many(elems)
+            self.not_empty.notify(len(elems))
+
+    def get(self, block=True, timeout=None):
+        with self.not_empty:
+            self.__wait(self.not_empty, self.pq.__len__, block, timeout, queue.Empty)
+            elem = self.pq.poll()
+            self.__notify_not_full(1)
+            return elem
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def drain(self, max_items=None, block=True, timeout=None):
+        """
+        Remove and return up to max_items (default all) of the smallest
+        elements in order. Waits like get() until there is at least one.
+        """
+        with self.not_empty:
+            self.__wait(self.not_empty, self.pq.__len__, block, timeout, queue.Empty)
+            k = len(self.pq) if max_items is None else max_items
+            elems = self.pq.poll_many(k)
+            self.__notify_not_full(len(elems))
+            return elems
+
+    def __notify_not_full(self, freed):
+        if self.batch_putters:
+            self.not_full.notify_all()
+        else:
+            self.not_full.notify(freed)
+
+    def __not_full(self):
+        return self.__has_room(1)
+
+    def __has_room(self, k):
+        return self.maxsize <= 0 or len(self.pq) + k <= self.maxsize
+
+    @staticmethod
+    def __wait(condition, ready, block, timeout, exc):
+        # Called with the lock held, raises exc like the standard library
+        # queues when ready() does not come true in time
+        if not block:
+            if not ready():
+                raise exc
+        elif timeout is not None and timeout < 0:
+            raise ValueError("'timeout' must be a non-negative number")
+        elif not condition.wait_for(ready, timeout):
+            raise exc
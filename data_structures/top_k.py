@@ -0,0 +1,160 @@
+from __future__ import annotations
+import math
+from typing import Callable, Iterable
+
+from data_structures.pqueue import PQueue
+
+
+class Entry:
+    # A kept item with its key and arrival number. Entries compare by key,
+    # then the later arrival counts as smaller, so items themselves are never
+    # compared or hashed. Smaller means worse: TopK(largest=True) keeps its
+    # worst entry at the root of a min heap.
+    __slots__ = ("key", "seq", "item")
+
+    def __init__(self, key, seq: int, item):
+        self.key = key
+        self.seq = seq
+        self.item = item
+
+    def __lt__(self, other: Entry) -> bool:
+        if self.key == other.key:
+            return self.seq > other.seq
+        return self.key < other.key
+
+
+class ReversedEntry(Entry):
+    # For the k smallest items, where the larger key is the worse one
+    __slots__ = ()
+
+    def __lt__(self, other: Entry) -> bool:
+        if self.key == other.key:
+            return self.seq > other.seq
+        return other.key < self.key
+
+
+class TopK:
+    # Keeps the k smallest (or with largest=True the k largest) items of a
+    # stream in a PQueue of at most k entries, ordered so that the entry of
+    # the worst kept item sits at the root. Items that are not better than
+    # the root are rejected with one comparison, the others replace it, so
+    # memory stays O(k) however long the stream is and key() runs once per
+    # item. Of items with equal keys the earlier ones are kept. Partial
+    # results from chunks (e.g. in worker processes, TopK pickles if its key
+    # does) are combined with merge().
+    def __init__(self, k: int, key: Callable = None, largest: bool = False):
+        if not isinstance(k, int):
+            raise TypeError("k must be an int")
+        if k <= 0:
+            raise ValueError("k must be greater than 0")
+
+        self.k = k
+        self.key = key
+        self.largest = largest
+        self.seen = 0  # items pushed so far, kept or not
+        # Entries never need to be found again, so no position tracking and
+        # items do not have to be hashable
+        self.pq = PQueue(k, track_positions=False)
+        self.entry = Entry if largest else ReversedEntry
+
+    def __len__(self) -> int:
+        return len(self.pq)
+
+    def push(self, item):
+        self.push_many((item,))
+
+    def push_many(self, items: Iterable):
+        pq, key, k, entry = self.pq, self.key, self.k, self.entry
+        it = iter(items)
+        seq = self.seen
+        if len(pq) < k:
+            for item in it:
+                pq.append(entry(item if key is None else key(item), seq, item))
+                seq += 1
+                if len(pq) == k:
+                    break
+            if len(pq) < k:
+                self.seen = seq
+                return
+
+        # Full from here on, one loop per comparison direction and key mode
+        # keeps the common reject path to a single comparison
+        heap = pq.heap
+        worst = heap[0].key
+        seq -= 1  # the last one handed out, should the stream be over already
+        if key is None and not self.largest:
+            for seq, item in enumerate(it, seq + 1):
+                if item < worst:
+                    pq.replace(entry(item, seq, item))
+                    worst = heap[0].key
+        elif key is None:
+            for seq, item in enumerate(it, seq + 1):
+                if item > worst:
+                    pq.replace(entry(item, seq, item))
+                    worst = heap[0].key
+        elif not self.largest:
+            for seq, item in enumerate(it, seq + 1):
+                item_key = key(item)
+                if item_key < worst:
+                    pq.replace(entry(item_key, seq, item))
+                    worst = heap[0].key
+        else:
+            for seq, item in enumerate(it, seq + 1):
+                item_key = key(item)
+                if item_key > worst:
+                    pq.replace(entry(item_key, seq, item))
+                    worst = heap[0].key
+
+        self.seen = seq + 1
+
+    def merge(self, other: TopK):
+        """
+        Add the kept items of a TopK over another part of the stream.
+        """
+        if other.largest != self.largest:
+            raise ValueError("Cannot merge smallest and largest selectors")
+
+        seen = self.seen + other.seen
+        self.push_many(other.items())
+        self.seen = seen
+
+    def items(self) -> list:
+        """
+        The kept items, best first: ascending, or descending with largest.
+        """
+        kept = sorted(self.pq.heap[: self.pq.heap_size], reverse=True)
+        return [entry.item for entry in kept]
+
+    def percentile(self, q: float):
+        """
+        Nearest-rank q-th percentile (0 < q <= 100) of every item pushed so
+        far. It is exact, but only known when that rank is among the kept
+        items, i.e. the upper tail with largest, the lower one otherwise.
+        """
+        if not 0 < q <= 100:
+            raise ValueError("q must be in (0, 100]")
+        if not self.seen:
+            raise ValueError("No items pushed yet")
+
+        rank = math.ceil(q / 100 * self.seen)  # 1 based, ascending
+        i = self.seen - rank if self.largest else rank - 1
+        kept = self.items()
+        if i >= len(kept):
+            raise ValueError(
+                f"The {q}th percentile is not among the {len(kept)} kept items"
+            )
+        return kept[i]
+
+    def __getstate__(self) -> dict:
+        return {
+            "k": self.k,
+            "key": self.key,
+            "largest": self.largest,
+            "seen": self.seen,
+            "items": self.items(),
+        }
+
+    def __setstate__(self, state: dict):
+        self.__init__(state["k"], state["key"], state["largest"])
+        self.push_many(state["items"])
+        self.seen = state["seen"]
@@ -0,0 +1,125 @@
+from typing import Iterator
+
+
+class TreeQueries:
+    # Ordered queries for binary search trees keeping their root in self.root
+    # and nodes with value, left and right. Iterators walk the tree with an
+    # explicit stack of at most height nodes and produce values lazily, so
+    # stopping early costs nothing. The tree must not change while iterating.
+
+    def __iter__(self) -> Iterator:
+        return self.irange()
+
+    def __reversed__(self) -> Iterator:
+        return self.irange(reverse=True)
+
+    def irange(self, lo=None, hi=None, reverse: bool = False) -> Iterator:
+        """
+        Values in [lo, hi] in order, or in reverse order with reverse. None
+        leaves that end open.
+        """
+        if reverse:
+            return self.__descending(lo, hi)
+        return self.__ascending(lo, hi)
+
+    def min(self):
+        node = self.root
+        if node is None:
+            return None
+        while node.left is not None:
+            node = node.left
+        return node.value
+
+    def max(self):
+        node = self.root
+        if node is None:
+            return None
+        while node.right is not None:
+            node = node.right
+        return node.value
+
+    def floor(self, value):
+        """
+        The largest value <= value, or None.
+        """
+        return self.__below(value, True)
+
+    def ceiling(self, value):
+        """
+        The smallest value >= value, or None.
+        """
+        return self.__above(value, True)
+
+    def predecessor(self, value):
+        """
+        The largest value < value, or None.
+        """
+        return self.__below(value, False)
+
+    def successor(self, value):
+        """
+        The smallest value > value, or None.
+        """
+        return self.__above(value, False)
+
+    def __below(self, value, inclusive: bool):
+        node, best = self.root, None
+        while node is not None:
+            if node.value < value or (inclusive and node.value == value):
+                best = node.value
+                node = node.right
+            else:
+                node = node.left
+        return best
+
+    def __above(self, value, inclusive: bool):
+        node, best = self.root, None
+        while node is not None:
+            if node.value > value or (inclusive and node.value == value):
+                best = node.value
+                node = node.left
+            else:
+                node = node.right
+        return best
+
+    def __ascending(self, lo, hi) -> Iterator:
+        # The stack holds the path to the next value, seeded with the nodes
+        # >= lo on the way down to lo
+        stack, node = [], self.root
+        while node is not None:
+            if lo is not None and node.value < lo:
+                node = node.right
+            else:
+                stack.append(node)
+                node = node.left
+
+        while stack:
+            node = stack.pop()
+            if hi is not None and node.value > hi:
+                return
+            yield node.value
+
+            node = node.right
+            while node is not None:
+                stack.append(node)
+                node = node.left
+
+    def __descending(self, lo, hi) -> Iterator:
+        stack, node = [], self.root
+        while node is not None:
+            if hi is not None and node.value > hi:
+                node = node.left
+            else:
+                stack.append(node)
+                node = node.right
+
+        while stack:
+            node = stack.pop()
+            if lo is not None and node.value < lo:
+                return
+            yield node.value
+
+            node = node.left
+            while node is not None:
+                stack.append(node)
+                node = node.right